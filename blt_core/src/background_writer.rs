@@ -0,0 +1,265 @@
+//! This module is internal to `blt_core` and provides a double-buffered file writer.
+//!
+//! It is not intended for direct use by external crates.
+//!
+//! [`BackgroundFileWriter`] collects output into large buffers and hands each full buffer to a
+//! dedicated writer thread over a bounded channel. While the writer thread drains one buffer
+//! with `write_all`, the pipeline keeps filling the next, so tokenization overlaps with write
+//! latency instead of waiting on it. Drained buffers are sent back to be reused, which keeps the
+//! number of live buffers bounded by the channel depth. Buffers are allocated lazily and grow
+//! with the data written, so short outputs never pay for full-size buffers.
+
+use std::fs::File;
+use std::future::Future;
+use std::io::{self, Write};
+use std::pin::Pin;
+use std::sync::mpsc as std_mpsc;
+use std::task::{ready, Context, Poll};
+use std::thread;
+
+use tokio::io::AsyncWrite;
+use tokio::sync::{mpsc, oneshot};
+use tokio_util::sync::PollSender;
+
+/// Maximum size of each output buffer handed to the writer thread.
+const BUFFER_CAPACITY: usize = 4 * 1024 * 1024; // 4MB
+
+/// Number of full buffers that may be queued for the writer thread at once.
+const QUEUE_DEPTH: usize = 2;
+
+/// A message sent from the writer handle to the writer thread.
+enum Message {
+    /// A full buffer to be written to the file.
+    Data(Vec<u8>),
+    /// A barrier acknowledged once every preceding buffer has been written.
+    Flush(oneshot::Sender<io::Result<()>>),
+}
+
+/// An [`AsyncWrite`] that writes to a file from a dedicated background thread.
+///
+/// Data is only guaranteed to reach the file once `flush` or `shutdown` has completed.
+/// As with `tokio::io::BufWriter`, data buffered when the writer is dropped is discarded.
+pub(crate) struct BackgroundFileWriter {
+    buffer: Vec<u8>,
+    sender: PollSender<Message>,
+    recycled: std_mpsc::Receiver<Vec<u8>>,
+    pending_flush: Option<oneshot::Receiver<io::Result<()>>>,
+}
+
+impl BackgroundFileWriter {
+    /// Creates a writer that owns `file` and spawns the thread that writes to it.
+    pub(crate) fn new(file: File) -> io::Result<Self> {
+        let (sender, receiver) = mpsc::channel(QUEUE_DEPTH);
+        let (recycle_tx, recycled) = std_mpsc::channel();
+        thread::Builder::new()
+            .name("blt-writer".to_string())
+            .spawn(move || write_loop(output_sink(file), receiver, recycle_tx))?;
+        Ok(Self {
+            buffer: Vec::new(),
+            sender: PollSender::new(sender),
+            recycled,
+            pending_flush: None,
+        })
+    }
+
+    /// Hands the current buffer to the writer thread, waiting for space in the queue.
+    fn poll_send_buffer(&mut self, cx: &mut Context<'_>) -> Poll<io::Result<()>> {
+        ready!(self.sender.poll_reserve(cx)).map_err(|_| writer_closed())?;
+        let next = self.next_buffer();
+        let data = std::mem::replace(&mut self.buffer, next);
+        self.sender
+            .send_item(Message::Data(data))
+            .map_err(|_| writer_closed())?;
+        Poll::Ready(Ok(()))
+    }
+
+    /// Returns a drained buffer from the writer thread, or an empty one if none is available.
+    fn next_buffer(&self) -> Vec<u8> {
+        self.recycled.try_recv().unwrap_or_default()
+    }
+
+    /// Makes room for `additional` more bytes, at least doubling the buffer but never growing
+    /// it past `BUFFER_CAPACITY`.
+    fn reserve(&mut self, additional: usize) {
+        let needed = self.buffer.len() + additional;
+        if needed > self.buffer.capacity() {
+            let target = needed.max(self.buffer.capacity() * 2).min(BUFFER_CAPACITY);
+            self.buffer.reserve_exact(target - self.buffer.len());
+        }
+    }
+}
+
+impl AsyncWrite for BackgroundFileWriter {
+    fn poll_write(
+        self: Pin<&mut Self>,
+        cx: &mut Context<'_>,
+        buf: &[u8],
+    ) -> Poll<io::Result<usize>> {
+        let this = self.get_mut();
+        if this.buffer.len() >= BUFFER_CAPACITY {
+            ready!(this.poll_send_buffer(cx))?;
+        }
+        let len = buf.len().min(BUFFER_CAPACITY - this.buffer.len());
+        this.reserve(len);
+        this.buffer.extend_from_slice(&buf[..len]);
+        Poll::Ready(Ok(len))
+    }
+
+    fn poll_flush(self: Pin<&mut Self>, cx: &mut Context<'_>) -> Poll<io::Result<()>> {
+        let this = self.get_mut();
+        if this.pending_flush.is_none() {
+            if !this.buffer.is_empty() {
+                ready!(this.poll_send_buffer(cx))?;
+            }
+            ready!(this.sender.poll_reserve(cx)).map_err(|_| writer_closed())?;
+            let (ack_tx, ack_rx) = oneshot::channel();
+            this.sender
+                .send_item(Message::Flush(ack_tx))
+                .map_err(|_| writer_closed())?;
+            this.pending_flush = Some(ack_rx);
+        }
+
+        let ack = this
+            .pending_flush
+            .as_mut()
+            .expect("flush barrier was just sent");
+        let result = ready!(Pin::new(ack).poll(cx));
+        this.pending_flush = None;
+        Poll::Ready(result.unwrap_or_else(|_| Err(writer_closed())))
+    }
+
+    fn poll_shutdown(self: Pin<&mut Self>, cx: &mut Context<'_>) -> Poll<io::Result<()>> {
+        let this = self.get_mut();
+        ready!(Pin::new(&mut *this).poll_flush(cx))?;
+        this.sender.close();
+        Poll::Ready(Ok(()))
+    }
+}
+
+/// Wraps `file` in the sink used by the writer thread.
+///
+/// With the `io-uring` feature on Linux, large buffers are written as batches of concurrent
+/// `io_uring` writes; otherwise the file is written with plain `write_all` calls.
+#[cfg(all(feature = "io-uring", target_os = "linux"))]
+fn output_sink(file: File) -> crate::uring_writer::UringFile {
+    crate::uring_writer::UringFile::new(file)
+}
+
+#[cfg(not(all(feature = "io-uring", target_os = "linux")))]
+fn output_sink(file: File) -> File {
+    file
+}
+
+/// Drains buffers from `receiver` into `file` until the writer handle is dropped.
+///
+/// The first write error is kept and reported to every later flush; buffers received after
+/// an error are discarded so the producer is never blocked on a failed file.
+fn write_loop<W: Write>(
+    mut file: W,
+    mut receiver: mpsc::Receiver<Message>,
+    recycle: std_mpsc::Sender<Vec<u8>>,
+) {
+    let mut error: Option<io::Error> = None;
+    while let Some(message) = receiver.blocking_recv() {
+        match message {
+            Message::Data(mut data) => {
+                if error.is_none() {
+                    error = file.write_all(&data).err();
+                    if error.is_some() {
+                        // A failed `io_uring` write may leave the kernel still reading
+                        // `data`, so the buffer is leaked rather than reused or freed.
+                        std::mem::forget(data);
+                        continue;
+                    }
+                }
+                data.clear();
+                let _ = recycle.send(data);
+            }
+            Message::Flush(ack) => {
+                let result = match &error {
+                    Some(e) => Err(io::Error::new(e.kind(), e.to_string())),
+                    None => file.flush(),
+                };
+                let _ = ack.send(result);
+            }
+        }
+    }
+}
+
+fn writer_closed() -> io::Error {
+    io::Error::new(
+        io::ErrorKind::BrokenPipe,
+        "Background writer thread has stopped",
+    )
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use tempfile::NamedTempFile;
+    use tokio::io::AsyncWriteExt;
+
+    #[tokio::test]
+    async fn test_writes_reach_file_after_flush() -> io::Result<()> {
+        let file = NamedTempFile::new()?;
+        let mut writer = BackgroundFileWriter::new(file.reopen()?)?;
+        writer.write_all(b"hello ").await?;
+        writer.write_all(b"world").await?;
+        writer.flush().await?;
+        assert_eq!(std::fs::read(file.path())?, b"hello world");
+        Ok(())
+    }
+
+    #[tokio::test]
+    async fn test_writes_larger_than_buffer_preserve_order() -> io::Result<()> {
+        let file = NamedTempFile::new()?;
+        let mut writer = BackgroundFileWriter::new(file.reopen()?)?;
+        let data: Vec<u8> = (0..BUFFER_CAPACITY * 3 + 17)
+            .map(|i| (i % 251) as u8)
+            .collect();
+        for chunk in data.chunks(1000 * 1000) {
+            writer.write_all(chunk).await?;
+        }
+        writer.shutdown().await?;
+        assert_eq!(std::fs::read(file.path())?, data);
+        Ok(())
+    }
+
+    #[tokio::test]
+    async fn test_buffers_grow_with_the_data() -> io::Result<()> {
+        let file = NamedTempFile::new()?;
+        let mut writer = BackgroundFileWriter::new(file.reopen()?)?;
+        assert_eq!(writer.buffer.capacity(), 0);
+        writer.write_all(b"small").await?;
+        assert!(writer.buffer.capacity() < BUFFER_CAPACITY);
+        writer.write_all(&vec![0; BUFFER_CAPACITY * 2]).await?;
+        assert!(writer.buffer.capacity() <= BUFFER_CAPACITY);
+        writer.shutdown().await?;
+        assert_eq!(
+            std::fs::metadata(file.path())?.len(),
+            5 + BUFFER_CAPACITY as u64 * 2
+        );
+        Ok(())
+    }
+
+    #[tokio::test]
+    async fn test_flush_without_writes() -> io::Result<()> {
+        let file = NamedTempFile::new()?;
+        let mut writer = BackgroundFileWriter::new(file.reopen()?)?;
+        writer.flush().await?;
+        writer.flush().await?;
+        assert!(std::fs::read(file.path())?.is_empty());
+        Ok(())
+    }
+
+    #[tokio::test]
+    async fn test_write_error_is_reported_on_flush() -> io::Result<()> {
+        let file = NamedTempFile::new()?;
+        let read_only = File::open(file.path())?;
+        let mut writer = BackgroundFileWriter::new(read_only)?;
+        writer.write_all(b"data").await?;
+        assert!(writer.flush().await.is_err());
+        assert!(writer.flush().await.is_err());
+        Ok(())
+    }
+}
@@ -0,0 +1,425 @@
+//! This module is internal to `blt_core` and implements the BPE merge loops.
+//!
+//! It is not intended for direct use by external crates.
+//!
+//! [`encode_in_passes`] applies merges in repeated left-to-right passes, the chunk-level
+//! encoding used by `BpeStrategy`. It works in place on the token array.
+//!
+//! [`encode`] applies merges in rank order: the adjacent pair whose merged token has the
+//! lowest ID is merged first, leftmost first on ties, so merges take effect in the order
+//! they appear in a merges file. It is used for words, and two encoders produce identical
+//! output:
+//!
+//! - a flat encoder that rescans an array of pair ranks after each merge, which is the
+//!   fastest option for short inputs such as single words, and
+//! - a heap encoder that keeps the symbols in a doubly-linked list and the candidate
+//!   pairs in a priority queue, so each merge costs O(log n) on long inputs.
+//!
+//! Both encoders are generic over the width of their pair ranks. Ranks are stored as
+//! `u16` whenever every merged token fits below the `u16::MAX` sentinel, which halves the
+//! memory the merge scan and the candidate queue move around; `u32` is only used for
+//! vocabularies that reach the top of the token range.
+
+use crate::merge_table::MergeTable;
+use std::cmp::Reverse;
+use std::collections::BinaryHeap;
+use std::io;
+
+/// Number of ranks reduced side by side when searching for the lowest-ranked pair.
+const RANK_LANES: usize = 8;
+
+/// Inputs up to this length use the flat encoder; longer ones use the heap encoder.
+const FLAT_ENCODER_MAX_LEN: usize = 64;
+
+/// Marks the absence of a previous or next symbol in the linked list.
+const NONE: u32 = u32::MAX;
+
+/// Storage type for the rank of an adjacent pair.
+///
+/// A pair's rank is the token it merges into, so any type wide enough to hold every
+/// merged token plus the [`Rank::NO_MERGE`] sentinel will do.
+trait Rank: Copy + Ord {
+    /// Rank of an adjacent pair that has no merge rule; sorts after every real rank.
+    const NO_MERGE: Self;
+
+    fn from_token(token: u16) -> Self;
+
+    fn to_token(self) -> u16;
+}
+
+impl Rank for u16 {
+    const NO_MERGE: Self = u16::MAX;
+
+    #[inline]
+    fn from_token(token: u16) -> Self {
+        token
+    }
+
+    #[inline]
+    fn to_token(self) -> u16 {
+        self
+    }
+}
+
+impl Rank for u32 {
+    const NO_MERGE: Self = u32::MAX;
+
+    #[inline]
+    fn from_token(token: u16) -> Self {
+        u32::from(token)
+    }
+
+    #[inline]
+    fn to_token(self) -> u16 {
+        self as u16
+    }
+}
+
+/// Encodes `data` in repeated left-to-right passes until a pass makes no merge.
+///
+/// Each pass merges every adjacent pair that has a rule as soon as it is found, then
+/// continues after the merged pair. Tokens are compacted in place, so the working set is
+/// the token array alone (two bytes per input byte), whatever the input length.
+pub(crate) fn encode_in_passes(data: &[u8], merge_table: &MergeTable) -> Vec<u16> {
+    let mut tokens: Vec<u16> = data.iter().map(|&b| u16::from(b)).collect();
+    loop {
+        let len = tokens.len();
+        let mut read = 0;
+        let mut write = 0;
+        while read < len {
+            let merged = (read + 1 < len)
+                .then(|| merge_table.get(tokens[read], tokens[read + 1]))
+                .flatten();
+            match merged {
+                Some(token) => {
+                    tokens[write] = token;
+                    read += 2;
+                }
+                None => {
+                    tokens[write] = tokens[read];
+                    read += 1;
+                }
+            }
+            write += 1;
+        }
+        tokens.truncate(write);
+        if write == len {
+            return tokens;
+        }
+    }
+}
+
+/// Encodes `data` into tokens by applying the merges in `merge_table` in rank order.
+///
+/// The heap encoder needs about 32 bytes of working memory per input byte, so callers
+/// should keep inputs short; inputs of 4GiB or more are rejected.
+pub(crate) fn encode(data: &[u8], merge_table: &MergeTable) -> io::Result<Vec<u16>> {
+    if merge_table.has_narrow_tokens() {
+        encode_with_ranks::<u16>(data, merge_table)
+    } else {
+        encode_with_ranks::<u32>(data, merge_table)
+    }
+}
+
+fn encode_with_ranks<R: Rank>(data: &[u8], merge_table: &MergeTable) -> io::Result<Vec<u16>> {
+    if data.len() <= FLAT_ENCODER_MAX_LEN {
+        Ok(encode_flat::<R>(data, merge_table))
+    } else {
+        encode_with_heap::<R>(data, merge_table)
+    }
+}
+
+/// Encodes `data` by rescanning a flat array of pair ranks after every merge.
+///
+/// Ranks of all adjacent pairs are kept in a flat array; after each merge only the two
+/// neighbouring ranks are recomputed. Each merge costs O(n), which is the cheapest option
+/// for short inputs such as single words.
+fn encode_flat<R: Rank>(data: &[u8], merge_table: &MergeTable) -> Vec<u16> {
+    let mut tokens: Vec<u16> = data.iter().map(|&b| b as u16).collect();
+    let mut ranks: Vec<R> = tokens
+        .windows(2)
+        .map(|pair| pair_rank(merge_table, pair[0], pair[1]))
+        .collect();
+
+    while let Some(i) = lowest_rank_position(&ranks) {
+        tokens[i] = ranks[i].to_token(); // A pair's rank is its merged token.
+        tokens.remove(i + 1);
+        ranks.remove(i);
+        if i > 0 {
+            ranks[i - 1] = pair_rank(merge_table, tokens[i - 1], tokens[i]);
+        }
+        if i < ranks.len() {
+            ranks[i] = pair_rank(merge_table, tokens[i], tokens[i + 1]);
+        }
+    }
+    tokens
+}
+
+/// Returns the rank of merging `first` and `second`, or `NO_MERGE` if there is no rule.
+#[inline]
+fn pair_rank<R: Rank>(merge_table: &MergeTable, first: u16, second: u16) -> R {
+    merge_table
+        .get(first, second)
+        .map_or(R::NO_MERGE, R::from_token)
+}
+
+/// Returns the position of the leftmost lowest-ranked pair, if any pair can be merged.
+fn lowest_rank_position<R: Rank>(ranks: &[R]) -> Option<usize> {
+    let lowest = lowest_rank(ranks);
+    if lowest == R::NO_MERGE {
+        return None;
+    }
+    ranks.iter().position(|&rank| rank == lowest)
+}
+
+/// Returns the lowest rank in `ranks`, or `NO_MERGE` if it is empty.
+///
+/// Ranks are reduced in fixed-width lanes with `min` instead of compare-and-branch, which
+/// the compiler turns into SIMD minimum instructions on targets that have them.
+fn lowest_rank<R: Rank>(ranks: &[R]) -> R {
+    let chunks = ranks.chunks_exact(RANK_LANES);
+    let tail = chunks.remainder().iter().copied().fold(R::NO_MERGE, R::min);
+    let lanes = chunks.fold([R::NO_MERGE; RANK_LANES], |mut lanes, chunk| {
+        for (lane, &rank) in lanes.iter_mut().zip(chunk) {
+            *lane = (*lane).min(rank);
+        }
+        lanes
+    });
+    lanes.into_iter().fold(tail, R::min)
+}
+
+// --- Heap Encoder ---
+
+/// A symbol in the linked list used by the heap encoder.
+///
+/// Links are `u32` indices rather than `usize`, which keeps a symbol to 16 bytes; longer
+/// inputs are rejected by [`encode`].
+struct Symbol {
+    token: u16,
+    prev: u32,
+    next: u32,
+    /// Bumped whenever the symbol's token changes or the symbol is merged away, which
+    /// invalidates every queued candidate that refers to it.
+    version: u32,
+}
+
+/// A queued pair of adjacent symbols, ordered by rank and then by position.
+#[derive(Clone, Copy, PartialEq, Eq, PartialOrd, Ord)]
+struct Candidate<R> {
+    rank: R,
+    left: u32,
+    left_version: u32,
+    right_version: u32,
+}
+
+/// Encodes `data` with a doubly-linked list of symbols and a min-heap of candidate pairs.
+///
+/// Merging a pair rewrites the left symbol, unlinks the right one and queues the two new
+/// pairs around it. Stale candidates are not removed from the heap; they are skipped
+/// when popped because a symbol they refer to has a newer version.
+fn encode_with_heap<R: Rank>(data: &[u8], merge_table: &MergeTable) -> io::Result<Vec<u16>> {
+    let len = u32::try_from(data.len()).map_err(|_| {
+        io::Error::new(
+            io::ErrorKind::InvalidInput,
+            format!("BPE input of {} bytes is too long to encode", data.len()),
+        )
+    })?;
+    let mut symbols: Vec<Symbol> = (0..len)
+        .map(|i| Symbol {
+            token: u16::from(data[i as usize]),
+            prev: if i == 0 { NONE } else { i - 1 },
+            next: if i + 1 < len { i + 1 } else { NONE },
+            version: 0,
+        })
+        .collect();
+    let mut heap = BinaryHeap::with_capacity(data.len());
+    for left in 0..len.saturating_sub(1) {
+        push_candidate::<R>(&mut heap, &symbols, merge_table, left);
+    }
+
+    while let Some(Reverse(candidate)) = heap.pop() {
+        if !is_current(&symbols, &candidate) {
+            continue;
+        }
+        let left = candidate.left;
+        let right = symbols[left as usize].next;
+        let next = symbols[right as usize].next;
+
+        let symbol = &mut symbols[left as usize];
+        symbol.token = candidate.rank.to_token(); // A pair's rank is its merged token.
+        symbol.next = next;
+        symbol.version += 1;
+        let prev = symbol.prev;
+        symbols[right as usize].version += 1;
+        if next != NONE {
+            symbols[next as usize].prev = left;
+        }
+
+        if prev != NONE {
+            push_candidate(&mut heap, &symbols, merge_table, prev);
+        }
+        push_candidate(&mut heap, &symbols, merge_table, left);
+    }
+
+    Ok(collect_tokens(&symbols))
+}
+
+/// Queues the pair starting at `left`, if it has a merge rule.
+fn push_candidate<R: Rank>(
+    heap: &mut BinaryHeap<Reverse<Candidate<R>>>,
+    symbols: &[Symbol],
+    merge_table: &MergeTable,
+    left: u32,
+) {
+    let left_symbol = &symbols[left as usize];
+    if left_symbol.next == NONE {
+        return;
+    }
+    let right_symbol = &symbols[left_symbol.next as usize];
+    let rank = pair_rank::<R>(merge_table, left_symbol.token, right_symbol.token);
+    if rank != R::NO_MERGE {
+        heap.push(Reverse(Candidate {
+            rank,
+            left,
+            left_version: left_symbol.version,
+            right_version: right_symbol.version,
+        }));
+    }
+}
+
+/// Returns whether neither symbol of `candidate` has changed since it was queued.
+fn is_current<R>(symbols: &[Symbol], candidate: &Candidate<R>) -> bool {
+    let left = &symbols[candidate.left as usize];
+    left.version == candidate.left_version
+        && left.next != NONE
+        && symbols[left.next as usize].version == candidate.right_version
+}
+
+/// Walks the linked list from the first symbol, which is never merged away.
+fn collect_tokens(symbols: &[Symbol]) -> Vec<u16> {
+    let mut tokens = Vec::with_capacity(symbols.len());
+    let mut current = if symbols.is_empty() { NONE } else { 0 };
+    while current != NONE {
+        tokens.push(symbols[current as usize].token);
+        current = symbols[current as usize].next;
+    }
+    tokens
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::BpeMerges;
+    use std::sync::Arc;
+
+    fn table(pairs: &[((u16, u16), u16)]) -> MergeTable {
+        MergeTable::new(Arc::new(pairs.iter().copied().collect::<BpeMerges>()))
+    }
+
+    #[test]
+    fn test_encode_merges_lowest_rank_first() -> io::Result<()> {
+        let merges = table(&[((98, 99), 256), ((97, 98), 257), ((97, 256), 258)]);
+        // 'b' + 'c' outranks 'a' + 'b', so "abc" becomes 'a' + 256, then 258.
+        assert_eq!(encode(b"abc", &merges)?, vec![258]);
+        assert_eq!(encode(b"abab", &merges)?, vec![257, 257]);
+        assert_eq!(encode(b"", &merges)?, Vec::<u16>::new());
+        Ok(())
+    }
+
+    fn assert_lowest_rank_position_matches_scalar_scan<R: Rank + std::fmt::Debug>() {
+        let ranks: Vec<R> = (0..100u32)
+            .map(|i| R::from_token(((i * 7919) % 97 + 300) as u16))
+            .collect();
+        for len in 0..ranks.len() {
+            let slice = &ranks[..len];
+            let expected = slice
+                .iter()
+                .enumerate()
+                .min_by_key(|&(i, &rank)| (rank, i))
+                .map(|(i, _)| i);
+            assert_eq!(lowest_rank_position(slice), expected);
+        }
+        assert_eq!(lowest_rank_position(&[R::NO_MERGE; 20]), None);
+    }
+
+    #[test]
+    fn test_lowest_rank_position_matches_scalar_scan() {
+        assert_lowest_rank_position_matches_scalar_scan::<u16>();
+        assert_lowest_rank_position_matches_scalar_scan::<u32>();
+    }
+
+    fn pseudo_random_bytes(len: usize, seed: u32, alphabet: u8) -> Vec<u8> {
+        let mut state = seed;
+        (0..len)
+            .map(|_| {
+                state = state.wrapping_mul(1_103_515_245).wrapping_add(12_345);
+                b'a' + ((state >> 16) % u32::from(alphabet)) as u8
+            })
+            .collect()
+    }
+
+    #[test]
+    fn test_heap_encoder_matches_flat_encoder() -> io::Result<()> {
+        let merges = table(&[
+            ((97, 98), 256),
+            ((98, 99), 257),
+            ((256, 99), 258),
+            ((97, 97), 259),
+            ((259, 97), 260),
+            ((99, 256), 261),
+            ((258, 258), 262),
+        ]);
+        for seed in 0..50 {
+            for len in [0, 1, 2, 3, 10, 65, 300] {
+                let data = pseudo_random_bytes(len, seed, 3);
+                let expected = encode_flat::<u32>(&data, &merges);
+                let input = String::from_utf8_lossy(&data);
+                assert_eq!(encode_flat::<u16>(&data, &merges), expected, "{input:?}");
+                assert_eq!(
+                    encode_with_heap::<u16>(&data, &merges)?,
+                    expected,
+                    "{input:?}"
+                );
+                assert_eq!(
+                    encode_with_heap::<u32>(&data, &merges)?,
+                    expected,
+                    "{input:?}"
+                );
+            }
+        }
+        Ok(())
+    }
+
+    #[test]
+    fn test_heap_encoder_chained_merges_on_long_input() -> io::Result<()> {
+        let merges = table(&[((97, 97), 256), ((256, 256), 257)]);
+        let data = vec![b'a'; 1000];
+        assert_eq!(encode(&data, &merges)?, vec![257; 250]);
+        Ok(())
+    }
+
+    #[test]
+    fn test_encode_merges_into_highest_token() -> io::Result<()> {
+        let merges = table(&[((97, 98), u16::MAX - 1), ((u16::MAX - 1, 99), u16::MAX)]);
+        assert!(!merges.has_narrow_tokens());
+        assert_eq!(encode(b"abc", &merges)?, vec![u16::MAX]);
+        assert_eq!(encode(&b"abc".repeat(30), &merges)?, vec![u16::MAX; 30]);
+        Ok(())
+    }
+
+    #[test]
+    fn test_encode_in_passes_sweeps_left_to_right() {
+        let merges = table(&[((98, 99), 256), ((97, 98), 257), ((257, 99), 258)]);
+        // The first pass merges 'a' + 'b' before it can see 'b' + 'c'; the second merges 257 + 'c'.
+        assert_eq!(encode_in_passes(b"abc", &merges), vec![258]);
+        assert_eq!(encode_in_passes(b"bcab", &merges), vec![256, 257]);
+        assert_eq!(encode_in_passes(b"", &merges), Vec::<u16>::new());
+        assert_eq!(encode_in_passes(b"x", &merges), vec![120]);
+    }
+
+    #[test]
+    fn test_encode_in_passes_repeats_until_no_merge() {
+        let merges = table(&[((97, 97), 256), ((256, 256), 257), ((257, 257), 258)]);
+        assert_eq!(encode_in_passes(&[b'a'; 17], &merges), vec![258, 258, 97]);
+    }
+}
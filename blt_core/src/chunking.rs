@@ -11,7 +11,9 @@
 //!
 //! It is not intended for direct use by external crates.
 
+use crate::pretokenizer;
 use crate::CoreConfig;
+use std::sync::OnceLock;
 use sysinfo::System; // Removed SystemExt from direct import
 
 // Default chunk sizes if not specified by user and dynamic calculation fails or is bounded.
@@ -30,11 +32,7 @@ pub(crate) fn get_effective_chunk_size(config: &CoreConfig) -> usize {
     }
 
     // Dynamic calculation based on system resources
-    let mut sys = System::new_all();
-    sys.refresh_memory(); // Refresh RAM info
-
-    // Total system RAM in bytes
-    let total_ram_bytes = sys.total_memory();
+    let total_ram_bytes = total_memory_bytes();
 
     // Memory available for token buffers (e.g., 80% of total RAM, as per mem_cap_percent)
     // Convert mem_cap_percent (u8) to f64 for calculation
@@ -61,6 +59,44 @@ pub(crate) fn get_effective_chunk_size(config: &CoreConfig) -> usize {
         .clamp(ABSOLUTE_MIN_CHUNK_SIZE, ABSOLUTE_MAX_CHUNK_SIZE)
 }
 
+/// Returns the total system RAM in bytes, queried once per process.
+///
+/// Only memory is refreshed, rather than every process, CPU and disk, and the result is
+/// cached since total RAM does not change while the process runs.
+fn total_memory_bytes() -> u64 {
+    static TOTAL_MEMORY: OnceLock<u64> = OnceLock::new();
+    *TOTAL_MEMORY.get_or_init(|| {
+        let mut sys = System::new();
+        sys.refresh_memory();
+        sys.total_memory()
+    })
+}
+
+/// Splits `data` into `(start, len)` chunks of roughly `chunk_size` bytes.
+///
+/// When `align_to_words` is set, each chunk is extended to the next split point: a word
+/// boundary, or the end of a piece of a long word. Word-level strategies encode long words
+/// in those same pieces, so they produce the same output no matter how the input is chunked
+/// or how many workers process it, and a file without delimiters is still spread across
+/// workers.
+pub(crate) fn split_into_chunks(
+    data: &[u8],
+    chunk_size: usize,
+    align_to_words: bool,
+) -> Vec<(usize, usize)> {
+    let mut chunks = Vec::with_capacity(data.len() / chunk_size.max(1) + 1);
+    let mut start = 0;
+    while start < data.len() {
+        let mut end = (start + chunk_size.max(1)).min(data.len());
+        if align_to_words {
+            end = pretokenizer::split_point_at_or_after(data, start, end);
+        }
+        chunks.push((start, end - start));
+        start = end;
+    }
+    chunks
+}
+
 // This function is a placeholder from before, we'll remove or integrate it.
 // pub fn calculate_chunk_size(config: &CoreConfig, total_ram_gb: f32) -> usize {
 //     println!("[chunking] Calculating chunk size. RAM: {}GB, Threads: {}, MemCap: {}%, Configured ChunkSize: {:?}",
@@ -90,6 +126,9 @@ mod tests {
             mem_cap_percent,
             bpe_data: None,
             passthrough_mode: false,
+            word_level_bpe: false,
+            bpe_cache_size: 0,
+            compact_output: false,
         }
     }
 
@@ -112,6 +151,51 @@ mod tests {
         );
     }
 
+    #[test]
+    fn test_split_into_chunks_fixed_size() {
+        let chunks = split_into_chunks(b"abcdefgh", 3, false);
+        assert_eq!(chunks, vec![(0, 3), (3, 3), (6, 2)]);
+    }
+
+    #[test]
+    fn test_split_into_chunks_empty() {
+        assert!(split_into_chunks(b"", 3, false).is_empty());
+        assert!(split_into_chunks(b"", 3, true).is_empty());
+    }
+
+    #[test]
+    fn test_split_into_chunks_aligned_to_words() {
+        let data = b"abc defg hi jk";
+        let chunks = split_into_chunks(data, 2, true);
+        assert_eq!(chunks, vec![(0, 3), (3, 5), (8, 3), (11, 3)]);
+        for (start, _) in chunks.iter().skip(1) {
+            assert_eq!(data[*start], b' ');
+        }
+    }
+
+    #[test]
+    fn test_split_into_chunks_aligned_without_delimiters() {
+        let chunks = split_into_chunks(b"abcdefgh", 3, true);
+        assert_eq!(chunks, vec![(0, 8)]);
+    }
+
+    #[test]
+    fn test_split_into_chunks_aligned_splits_long_words_at_piece_ends() {
+        let piece = pretokenizer::MAX_ENCODED_WORD_LEN;
+        let mut data = vec![b'x'; 3 * piece + 5];
+        data[0] = b' ';
+        let chunks = split_into_chunks(&data, 1000, true);
+        assert_eq!(
+            chunks,
+            vec![
+                (0, piece),
+                (piece, piece),
+                (2 * piece, piece),
+                (3 * piece, 5)
+            ]
+        );
+    }
+
     #[test]
     fn test_get_effective_chunk_size_dynamic() {
         // This test is environment-dependent (relies on actual system RAM).
@@ -5,46 +5,111 @@
 //!
 //! It is not intended for direct use by external crates.
 
+use crate::io_handler::{self, InputSource};
 use crate::BpeMerges; // Using the type alias from lib.rs
-                      // use std::collections::HashMap; // Unused here as BpeMerges is from lib.rs
-use std::fs::File;
-use std::io::{self, BufRead, BufReader};
+use std::io;
 use std::path::Path;
 
+/// Loads BPE merges from `path`, one pair of byte values per line.
+///
+/// The file is parsed as raw bytes: lines are located with `memchr` and fields are split
+/// in place, so no `String` is allocated per line and no UTF-8 validation is done.
+/// Lines starting with `#` and empty lines are skipped. The N-th merge line is assigned
+/// token ID `256 + N`; when a pair appears more than once, its last ID wins.
 pub(crate) fn load_bpe_merges_from_path(path: &Path) -> io::Result<BpeMerges> {
-    let file = File::open(path)?;
-    let reader = BufReader::new(file);
-    let mut merges = BpeMerges::new();
+    match io_handler::open_file_input(path)? {
+        InputSource::Mmap(mmap) => parse_bpe_merges(&mmap),
+        InputSource::Buffer(buffer) => parse_bpe_merges(&buffer),
+        InputSource::Stdin(_) => unreachable!("file input never yields stdin"),
+    }
+}
+
+fn parse_bpe_merges(data: &[u8]) -> io::Result<BpeMerges> {
+    let estimated_lines = memchr::memchr_iter(b'\n', data).count() + 1;
+    let mut merges = BpeMerges::with_capacity(estimated_lines);
     let mut vocab_size = 256u16; // Start new tokens after byte values
 
-    for line in reader.lines() {
-        let line = line?;
-        if line.starts_with('#') || line.is_empty() {
+    for line in lines(data) {
+        if line.first() == Some(&b'#') || line.is_empty() {
             continue;
         }
-        let parts: Vec<&str> = line.split_whitespace().collect();
-        if parts.len() == 2 {
-            let byte1 = parts[0].parse::<u8>().map_err(|e| {
-                io::Error::new(
-                    io::ErrorKind::InvalidData,
-                    format!("Failed to parse first byte value: {e} in line '{line}'"),
-                )
-            })?;
-            let byte2 = parts[1].parse::<u8>().map_err(|e| {
-                io::Error::new(
-                    io::ErrorKind::InvalidData,
-                    format!("Failed to parse second byte value: {e} in line '{line}'",),
-                )
-            })?;
-            merges.insert((byte1 as u16, byte2 as u16), vocab_size);
-            vocab_size += 1;
-        } else {
-            return Err(io::Error::new(io::ErrorKind::InvalidData, format!("Invalid merge rule format in line: '{line}'. Expected two numbers separated by space.")));
+        let mut fields = line
+            .split(|&b| is_field_separator(b))
+            .filter(|field| !field.is_empty());
+        match (fields.next(), fields.next(), fields.next()) {
+            (Some(first), Some(second), None) => {
+                let byte1 = parse_byte_value(first).map_err(|e| {
+                    io::Error::new(
+                        io::ErrorKind::InvalidData,
+                        format!(
+                            "Failed to parse first byte value: {e} in line '{}'",
+                            String::from_utf8_lossy(line)
+                        ),
+                    )
+                })?;
+                let byte2 = parse_byte_value(second).map_err(|e| {
+                    io::Error::new(
+                        io::ErrorKind::InvalidData,
+                        format!(
+                            "Failed to parse second byte value: {e} in line '{}'",
+                            String::from_utf8_lossy(line)
+                        ),
+                    )
+                })?;
+                merges.insert((byte1 as u16, byte2 as u16), vocab_size);
+                vocab_size += 1;
+            }
+            _ => {
+                return Err(io::Error::new(io::ErrorKind::InvalidData, format!("Invalid merge rule format in line: '{}'. Expected two numbers separated by space.", String::from_utf8_lossy(line))));
+            }
         }
     }
     Ok(merges)
 }
 
+/// Returns the lines of `data`, without their `\n` or `\r\n` terminators.
+fn lines(data: &[u8]) -> impl Iterator<Item = &[u8]> {
+    let mut start = 0;
+    let mut newlines = memchr::memchr_iter(b'\n', data);
+    std::iter::from_fn(move || {
+        let line = match newlines.next() {
+            Some(end) => {
+                let line = &data[start..end];
+                start = end + 1;
+                line.strip_suffix(b"\r").unwrap_or(line)
+            }
+            None if start < data.len() => {
+                let line = &data[start..];
+                start = data.len();
+                line
+            }
+            None => return None,
+        };
+        Some(line)
+    })
+}
+
+/// Returns whether `byte` separates the fields of a merge line (ASCII whitespace).
+fn is_field_separator(byte: u8) -> bool {
+    matches!(byte, b' ' | b'\t' | b'\r' | 0x0B | 0x0C)
+}
+
+/// Parses a decimal byte value.
+///
+/// Plain 1-3 digit values are converted directly; anything else goes through
+/// `str::parse`, which accepts the same inputs as before and produces its error message.
+fn parse_byte_value(field: &[u8]) -> Result<u8, std::num::ParseIntError> {
+    if (1..=3).contains(&field.len()) && field.iter().all(u8::is_ascii_digit) {
+        let value = field
+            .iter()
+            .fold(0u16, |acc, &digit| acc * 10 + u16::from(digit - b'0'));
+        if let Ok(byte) = u8::try_from(value) {
+            return Ok(byte);
+        }
+    }
+    String::from_utf8_lossy(field).parse::<u8>()
+}
+
 // Other configuration loading functions can be added here later (e.g., for patchers).
 
 #[cfg(test)]
@@ -154,6 +219,44 @@ mod tests {
         }
     }
 
+    #[test]
+    fn test_load_bpe_merges_crlf_and_extra_whitespace() -> io::Result<()> {
+        let mut file = NamedTempFile::new()?;
+        write!(file, "97 98\r\n# comment\r\n\t99   100 \n101 102")?;
+        file.flush()?;
+
+        let merges = load_bpe_merges_from_path(file.path())?;
+        let expected =
+            create_merges_map(vec![((97, 98), 256), ((99, 100), 257), ((101, 102), 258)]);
+        assert_eq!(merges, expected);
+        Ok(())
+    }
+
+    #[test]
+    fn test_load_bpe_merges_whitespace_only_line_is_invalid() {
+        let mut file = NamedTempFile::new().unwrap();
+        writeln!(file, "   ").unwrap();
+        file.flush().unwrap();
+
+        let result = load_bpe_merges_from_path(file.path());
+        assert!(result.is_err());
+        if let Err(e) = result {
+            assert_eq!(e.kind(), io::ErrorKind::InvalidData);
+            assert!(e.to_string().contains("Invalid merge rule format"));
+        }
+    }
+
+    #[test]
+    fn test_parse_byte_value_matches_str_parse() {
+        for field in ["0", "7", "255", "256", "999", "0007", "+5", "", "-1", "1a"] {
+            assert_eq!(
+                parse_byte_value(field.as_bytes()),
+                field.parse::<u8>(),
+                "field {field:?}"
+            );
+        }
+    }
+
     #[test]
     fn test_load_bpe_merges_file_not_found() {
         let non_existent_path = Path::new("this_file_should_not_exist.txt");
@@ -8,12 +8,25 @@
 //! (stdin/stdout). A key feature is its ability to use memory-mapped files for
 //! efficient processing of file inputs.
 
+use crate::background_writer::BackgroundFileWriter;
 use crate::CoreConfig;
+#[cfg(unix)]
+use memmap2::Advice;
 use memmap2::Mmap;
 use std::fs::File;
-use std::io;
+use std::io::{self, Read};
+use std::path::Path;
 use tokio::io::{AsyncRead, AsyncWrite, BufWriter as TokioBufWriter};
 
+/// Files larger than this are memory-mapped; smaller files are read into memory,
+/// where a single `read` is cheaper than setting up and tearing down a mapping.
+const MMAP_THRESHOLD_BYTES: u64 = 1024 * 1024; // 1MB
+
+/// Outputs expected to be at least this large are written from a background thread; smaller
+/// ones fit in a single background buffer, so a dedicated thread would add cost without
+/// overlapping any writes, and they go through a `BufWriter` instead.
+const BACKGROUND_WRITER_THRESHOLD_BYTES: u64 = 4 * 1024 * 1024; // 4MB
+
 // --- Type Aliases for I/O ---
 
 /// A type alias for a readable, asynchronous input stream.
@@ -26,12 +39,15 @@ pub type OutputWriter = Box<dyn AsyncWrite + Unpin + Send>;
 /// Represents the source of input data for the pipeline.
 ///
 /// This enum allows the pipeline to seamlessly handle different kinds of input:
-/// - A memory-mapped file (`Mmap`), which offers the highest performance for file-based input
-///   by avoiding extra copying.
+/// - A memory-mapped file (`Mmap`), which offers the highest performance for large file-based
+///   input by avoiding extra copying.
+/// - A fully buffered file (`Buffer`), used for small files where mapping costs more than reading.
 /// - A standard input stream (`Stdin`), for piping data into the application.
 pub enum InputSource {
     /// A memory-mapped file.
     Mmap(Mmap),
+    /// The contents of a small file, read into memory in one go.
+    Buffer(Vec<u8>),
     /// An asynchronous reader for standard input.
     Stdin(InputReader),
 }
@@ -50,23 +66,98 @@ pub enum InputSource {
 /// `io::Error` on failure.
 pub async fn setup_io(config: &CoreConfig) -> io::Result<(InputSource, OutputWriter)> {
     let input_source = match &config.input {
-        Some(path) => {
-            let file = File::open(path)?;
-            let mmap = unsafe { Mmap::map(&file)? };
-            InputSource::Mmap(mmap)
-        }
+        Some(path) => open_file_input(path)?,
         None => {
             let stdin_reader = Box::new(tokio::io::stdin());
             InputSource::Stdin(stdin_reader)
         }
     };
 
-    let output_writer = setup_output_writer(config).await?;
+    let output_writer = setup_output_writer(config, expected_output_len(&input_source)).await?;
     Ok((input_source, output_writer))
 }
 
-async fn setup_output_writer(config: &CoreConfig) -> io::Result<OutputWriter> {
+/// Opens a file input, choosing between a memory map and a buffered read by file size.
+///
+/// Input files are always read front to back, so the kernel is told so up front; this lets
+/// it read ahead aggressively from the first access instead of ramping up readahead as it
+/// detects the pattern.
+pub(crate) fn open_file_input(path: &Path) -> io::Result<InputSource> {
+    let mut file = File::open(path)?;
+    advise_sequential_file(&file);
+    let len = file.metadata()?.len();
+    if len > MMAP_THRESHOLD_BYTES {
+        let mmap = unsafe { Mmap::map(&file)? };
+        advise_sequential_mmap(&mmap);
+        return Ok(InputSource::Mmap(mmap));
+    }
+    let mut buffer = Vec::with_capacity(len as usize);
+    file.read_to_end(&mut buffer)?;
+    Ok(InputSource::Buffer(buffer))
+}
+
+/// Hints that `file` will be read sequentially with `posix_fadvise`.
+///
+/// Hints are best-effort, so failures are ignored.
+#[cfg(target_os = "linux")]
+fn advise_sequential_file(file: &File) {
+    use std::os::unix::io::AsRawFd;
+    // SAFETY: `posix_fadvise` only reads its arguments, and `file` is open for the call.
+    unsafe {
+        libc::posix_fadvise(file.as_raw_fd(), 0, 0, libc::POSIX_FADV_SEQUENTIAL);
+    }
+}
+
+#[cfg(not(target_os = "linux"))]
+fn advise_sequential_file(_file: &File) {}
+
+/// Hints that `mmap` will be read sequentially and soon, so pages are prefetched ahead of
+/// the pipeline's page faults.
+///
+/// Hints are best-effort, so failures are ignored.
+#[cfg(unix)]
+fn advise_sequential_mmap(mmap: &Mmap) {
+    let _ = mmap.advise(Advice::Sequential);
+    let _ = mmap.advise(Advice::WillNeed);
+}
+
+#[cfg(not(unix))]
+fn advise_sequential_mmap(_mmap: &Mmap) {}
+
+/// Estimates the output size from the input size, or `None` when reading a stream of unknown
+/// length.
+///
+/// Tokens are at least one byte per input byte, so the input length is a lower bound.
+fn expected_output_len(input_source: &InputSource) -> Option<u64> {
+    match input_source {
+        InputSource::Mmap(mmap) => Some(mmap.len() as u64),
+        InputSource::Buffer(buffer) => Some(buffer.len() as u64),
+        InputSource::Stdin(_) => None,
+    }
+}
+
+/// Returns whether output of the given expected size should be written from a background
+/// thread. Streams of unknown length may be arbitrarily large, so they are.
+fn uses_background_writer(expected_output_len: Option<u64>) -> bool {
+    match expected_output_len {
+        Some(len) => len >= BACKGROUND_WRITER_THRESHOLD_BYTES,
+        None => true,
+    }
+}
+
+/// Sets up the output sink, choosing the file writer by expected output size.
+///
+/// Large file outputs are written from a background thread so that tokenization does not
+/// wait on write latency; small ones go through a `BufWriter`.
+async fn setup_output_writer(
+    config: &CoreConfig,
+    expected_output_len: Option<u64>,
+) -> io::Result<OutputWriter> {
     match &config.output {
+        Some(path) if uses_background_writer(expected_output_len) => {
+            let file = File::create(path)?;
+            Ok(Box::new(BackgroundFileWriter::new(file)?))
+        }
         Some(path) => {
             let file = tokio::fs::File::create(path).await?;
             Ok(Box::new(TokioBufWriter::new(file)))
@@ -78,3 +169,61 @@ async fn setup_output_writer(config: &CoreConfig) -> io::Result<OutputWriter> {
 // Later, this module could include functions for managing ordered writing of processed chunks, etc.
 // For example:
 // pub async fn write_results_ordered(mut rx: tokio::sync::mpsc::Receiver<(usize, Vec<u8>)>, writer: &mut OutputWriter) -> io::Result<()> { ... }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::io::Write;
+    use tempfile::NamedTempFile;
+
+    fn create_input_file(len: usize) -> io::Result<NamedTempFile> {
+        let mut file = NamedTempFile::new()?;
+        file.write_all(&vec![b'x'; len])?;
+        file.flush()?;
+        Ok(file)
+    }
+
+    #[test]
+    fn test_open_file_input_small_file_is_buffered() -> io::Result<()> {
+        let file = create_input_file(1024)?;
+        match open_file_input(file.path())? {
+            InputSource::Buffer(buffer) => assert_eq!(buffer.len(), 1024),
+            _ => panic!("Expected a buffered input for a small file"),
+        }
+        Ok(())
+    }
+
+    #[test]
+    fn test_open_file_input_large_file_is_mapped() -> io::Result<()> {
+        let len = MMAP_THRESHOLD_BYTES as usize + 1;
+        let file = create_input_file(len)?;
+        match open_file_input(file.path())? {
+            InputSource::Mmap(mmap) => assert_eq!(mmap.len(), len),
+            _ => panic!("Expected a memory-mapped input for a large file"),
+        }
+        Ok(())
+    }
+
+    #[test]
+    fn test_open_file_input_empty_file() -> io::Result<()> {
+        let file = create_input_file(0)?;
+        match open_file_input(file.path())? {
+            InputSource::Buffer(buffer) => assert!(buffer.is_empty()),
+            _ => panic!("Expected a buffered input for an empty file"),
+        }
+        Ok(())
+    }
+
+    #[test]
+    fn test_background_writer_is_used_for_large_or_unknown_outputs() -> io::Result<()> {
+        let small = open_file_input(create_input_file(1024)?.path())?;
+        assert!(!uses_background_writer(expected_output_len(&small)));
+
+        let len = BACKGROUND_WRITER_THRESHOLD_BYTES as usize;
+        let large = open_file_input(create_input_file(len)?.path())?;
+        assert!(uses_background_writer(expected_output_len(&large)));
+
+        assert!(uses_background_writer(None));
+        Ok(())
+    }
+}
@@ -50,20 +50,32 @@ use tokio::io::AsyncWriteExt;
 use tracing::{info, instrument};
 
 use crate::tokenizer::{
-    BasicTokenizationStrategy, BpeStrategy, PassthroughStrategy, TokenizationStrategy,
+    BasicTokenizationStrategy, BpeStrategy, PassthroughStrategy, TextBpeStrategy,
+    TokenizationStrategy, DEFAULT_WORD_CACHE_CAPACITY,
 };
 
 // --- Module declarations ---
+/// Writes file output from a dedicated thread using double buffering.
+pub(crate) mod background_writer;
+/// Applies BPE merges in rank order.
+pub(crate) mod bpe_encoder;
 /// Handles dynamic chunk sizing based on system memory and CLI parameters.
 pub mod chunking;
 /// Responsible for loading BPE merge files.
 pub mod config_loader;
 /// Manages input and output sources, supporting files and standard I/O.
 pub mod io_handler;
+/// Lookup tables mapping token pairs to their merged token.
+pub(crate) mod merge_table;
 /// Contains the core multi-threaded pipeline logic for processing data chunks.
 pub mod pipeline;
+/// Splits text into words so BPE merges can be applied per word.
+pub(crate) mod pretokenizer;
 /// Defines tokenization strategies (BPE, Passthrough) and the `TokenizationStrategy` trait.
 pub mod tokenizer;
+/// Writes large output buffers through `io_uring` (Linux, `io-uring` feature only).
+#[cfg(all(feature = "io-uring", target_os = "linux"))]
+pub(crate) mod uring_writer;
 /// Utilities for parsing configurations and detecting system resources.
 pub mod utils;
 
@@ -127,6 +139,17 @@ pub struct CoreConfig {
     pub bpe_data: Option<Arc<BpeMerges>>,
     /// Whether to use passthrough mode (file copying without tokenization).
     pub passthrough_mode: bool,
+    /// Whether to apply BPE merges within whitespace-delimited words only, lowest merge ID
+    /// first, instead of across whole chunks in left-to-right passes.
+    pub word_level_bpe: bool,
+    /// Maximum number of words whose BPE encoding is cached with `word_level_bpe`.
+    /// A value of `0` disables the cache.
+    pub bpe_cache_size: usize,
+    /// Whether to write tokens at the narrowest width that fits the vocabulary.
+    ///
+    /// When set, the output starts with a 1-byte header holding the token width in bytes
+    /// (see [`CoreConfig::output_token_width`]). Ignored in passthrough mode.
+    pub compact_output: bool,
 }
 
 impl CoreConfig {
@@ -170,17 +193,59 @@ impl CoreConfig {
             mem_cap_percent: memcap.unwrap_or(80),
             bpe_data,
             passthrough_mode: passthrough,
+            word_level_bpe: false,
+            bpe_cache_size: DEFAULT_WORD_CACHE_CAPACITY,
+            compact_output: false,
         })
     }
 
-    fn parse_chunksize(chunksize: Option<String>) -> io::Result<Option<usize>> {
-        chunksize
-            .as_ref()
-            .map(|cs_str| utils::parse_chunk_size_str(cs_str))
-            .transpose()
+    /// Returns the width in bytes of each token in the output stream.
+    ///
+    /// Tokens are normally written as big-endian `u16`. With `compact_output`, a vocabulary
+    /// of only the 256 byte values (no merges and no content-type token) is written as one
+    /// byte per token, halving the output size.
+    pub fn output_token_width(&self) -> u8 {
+        if self.compact_output && self.vocabulary_fits_in_byte() {
+            1
+        } else {
+            2
+        }
+    }
+
+    /// Returns whether every token the configuration can produce is a plain byte value.
+    ///
+    /// Merged tokens extend the vocabulary past the 256 byte values, and content-type
+    /// tokens live in the reserved `0xFF01..=0xFF04` range, so either needs `u16` tokens.
+    fn vocabulary_fits_in_byte(&self) -> bool {
+        self.bpe_data.is_none() && self.content_type.is_none()
+    }
+
+    /// Returns the bytes written before the first token: the width header (with
+    /// `compact_output`) followed by the content-type token, if any.
+    fn output_header(&self) -> Vec<u8> {
+        let mut header = Vec::with_capacity(3);
+        if self.compact_output && !self.passthrough_mode {
+            header.push(self.output_token_width());
+        }
+        if let Some(ct) = self.content_type.as_ref() {
+            header.extend_from_slice(&ct.get_token_value().to_be_bytes());
+        }
+        header
+    }
+
+    /// Parses a human-readable chunk size such as `"16MB"`, `"256KB"` or `"4096"` into bytes.
+    ///
+    /// Callers that build many configurations can parse the size once and set
+    /// `cli_chunk_size` directly instead of passing the string to [`CoreConfig::new_from_cli`].
+    pub fn parse_chunk_size(chunk_size: &str) -> io::Result<usize> {
+        utils::parse_chunk_size_str(chunk_size)
             .map_err(|e| io::Error::new(io::ErrorKind::InvalidInput, e))
     }
 
+    fn parse_chunksize(chunksize: Option<String>) -> io::Result<Option<usize>> {
+        chunksize.as_deref().map(Self::parse_chunk_size).transpose()
+    }
+
     fn load_bpe_data(merges_path: &Option<PathBuf>) -> io::Result<Option<Arc<BpeMerges>>> {
         match merges_path {
             Some(path) => {
@@ -229,6 +294,18 @@ pub fn load_bpe_merges(path: &Path) -> io::Result<HashMap<(u8, u8), u16>> {
     Ok(converted)
 }
 
+/// Loads BPE merges from a file path as a merge table.
+///
+/// Unlike [`load_bpe_merges`], the table keeps its `u16` pair keys and can be used as
+/// [`CoreConfig::bpe_data`] directly.
+///
+/// # Arguments
+///
+/// * `path`: Path to the BPE merges file.
+pub fn load_bpe_merge_table(path: &Path) -> io::Result<BpeMerges> {
+    config_loader::load_bpe_merges_from_path(path)
+}
+
 /// Runs the entire tokenization pipeline with the given configuration.
 ///
 /// This is the main entry point of the `blt_core` library. It sets up the I/O,
@@ -242,16 +319,32 @@ pub fn load_bpe_merges(path: &Path) -> io::Result<HashMap<(u8, u8), u16>> {
 ///
 /// This function can return an `io::Error` if there are issues with file I/O,
 /// configuration loading, or during the processing pipeline itself.
-#[instrument(skip_all, fields(input = ?config.input, output = ?config.output))]
 pub async fn run_tokenizer(config: CoreConfig) -> io::Result<()> {
+    let strategy = select_strategy(&config);
+    run_tokenizer_with_strategy(config, strategy).await
+}
+
+/// Runs the tokenization pipeline with a strategy built earlier by [`select_strategy`].
+///
+/// Callers that tokenize many inputs with the same settings can build the strategy once
+/// and share it, so the merge table and the word cache are not rebuilt for every run.
+///
+/// # Arguments
+///
+/// * `config`: A `CoreConfig` struct containing all the necessary settings.
+/// * `strategy`: The strategy returned by [`select_strategy`] for an equivalent configuration.
+#[instrument(skip_all, fields(input = ?config.input, output = ?config.output))]
+pub async fn run_tokenizer_with_strategy(
+    config: CoreConfig,
+    strategy: Arc<dyn TokenizationStrategy>,
+) -> io::Result<()> {
     info!("Starting tokenizer");
 
-    let strategy = select_strategy(&config);
     let effective_chunk_size = chunking::get_effective_chunk_size(&config);
     info!(effective_chunk_size, "Chunk size determined");
 
     let (input_source, mut output_writer) = io_handler::setup_io(&config).await?;
-    prepend_content_type_token(&mut output_writer, config.content_type.as_ref()).await?;
+    output_writer.write_all(&config.output_header()).await?;
 
     pipeline::run(
         input_source,
@@ -266,29 +359,176 @@ pub async fn run_tokenizer(config: CoreConfig) -> io::Result<()> {
     Ok(())
 }
 
-// --- Private Helper Functions ---
+/// Tokenizes an in-memory buffer and returns the resulting token stream.
+///
+/// This applies the same strategy selection, chunking and output header as
+/// [`run_tokenizer`], but reads from `data` and returns the output bytes instead of
+/// going through files or standard I/O. The `input` and `output` fields of `config`
+/// are ignored.
+///
+/// # Arguments
+///
+/// * `config`: A `CoreConfig` struct containing the tokenization settings.
+/// * `data`: The bytes to tokenize.
+///
+/// # Errors
+///
+/// Returns an `io::Error` if the tokenization strategy fails on any chunk.
+pub async fn tokenize_bytes(config: &CoreConfig, data: &[u8]) -> io::Result<Vec<u8>> {
+    tokenize_bytes_with_strategy(config, select_strategy(config), data).await
+}
+
+/// Tokenizes an in-memory buffer with a strategy built earlier by [`select_strategy`].
+///
+/// See [`tokenize_bytes`] and [`run_tokenizer_with_strategy`].
+#[instrument(skip_all, fields(len = data.len()))]
+pub async fn tokenize_bytes_with_strategy(
+    config: &CoreConfig,
+    strategy: Arc<dyn TokenizationStrategy>,
+    data: &[u8],
+) -> io::Result<Vec<u8>> {
+    let effective_chunk_size = chunking::get_effective_chunk_size(config);
+
+    let mut output = config.output_header();
+    output.reserve(data.len() * usize::from(config.output_token_width()));
+    pipeline::run_in_memory(data, &mut output, effective_chunk_size, strategy).await?;
+    Ok(output)
+}
 
-fn select_strategy(config: &CoreConfig) -> Arc<dyn TokenizationStrategy> {
+/// Builds the tokenization strategy for `config`.
+///
+/// Building a BPE strategy prepares its merge lookup table (and, for text, its word
+/// cache), so callers running many inputs with the same settings should build it once
+/// and pass it to [`run_tokenizer_with_strategy`] or [`tokenize_bytes_with_strategy`].
+pub fn select_strategy(config: &CoreConfig) -> Arc<dyn TokenizationStrategy> {
     if config.passthrough_mode {
         info!("Using passthrough strategy (file copying without tokenization).");
         Arc::new(PassthroughStrategy)
     } else if let Some(ref bpe_data) = config.bpe_data {
-        info!("Using BPE tokenization strategy.");
-        Arc::new(BpeStrategy::new(bpe_data.clone()))
+        select_bpe_strategy(config, bpe_data.clone())
+    } else if config.output_token_width() == 1 {
+        info!("Using compact byte-width tokens (1 byte per token).");
+        Arc::new(PassthroughStrategy)
     } else {
         info!("Using basic tokenization strategy (byte-to-u16 conversion).");
         Arc::new(BasicTokenizationStrategy)
     }
 }
 
-async fn prepend_content_type_token(
-    writer: &mut io_handler::OutputWriter,
-    content_type: Option<&ContentType>,
-) -> io::Result<()> {
-    if let Some(ct) = content_type {
-        writer
-            .write_all(&ct.get_token_value().to_be_bytes())
-            .await?;
+// --- Private Helper Functions ---
+
+fn select_bpe_strategy(
+    config: &CoreConfig,
+    bpe_data: Arc<BpeMerges>,
+) -> Arc<dyn TokenizationStrategy> {
+    if config.word_level_bpe {
+        info!("Using word-level BPE tokenization strategy.");
+        Arc::new(TextBpeStrategy::new(bpe_data, config.bpe_cache_size))
+    } else {
+        info!("Using BPE tokenization strategy.");
+        Arc::new(BpeStrategy::new(bpe_data))
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn create_test_config(content_type: Option<ContentType>) -> CoreConfig {
+        CoreConfig::new_from_cli(
+            None,
+            None,
+            None,
+            content_type,
+            Some(1),
+            Some("1MB".to_string()),
+            None,
+            false,
+        )
+        .unwrap()
+    }
+
+    #[tokio::test]
+    async fn test_tokenize_bytes_basic() -> io::Result<()> {
+        let config = create_test_config(None);
+        let result = tokenize_bytes(&config, b"ab").await?;
+        assert_eq!(result, vec![0, 97, 0, 98]);
+        Ok(())
+    }
+
+    #[tokio::test]
+    async fn test_tokenize_bytes_prepends_content_type() -> io::Result<()> {
+        let config = create_test_config(Some(ContentType::Text));
+        let result = tokenize_bytes(&config, b"a").await?;
+        assert_eq!(result, vec![0xFF, 0x01, 0, 97]);
+        Ok(())
+    }
+
+    #[tokio::test]
+    async fn test_tokenize_bytes_compact_output_uses_byte_tokens() -> io::Result<()> {
+        let mut config = create_test_config(None);
+        config.compact_output = true;
+        assert_eq!(config.output_token_width(), 1);
+        let result = tokenize_bytes(&config, b"ab").await?;
+        assert_eq!(result, vec![1, 97, 98]);
+        Ok(())
+    }
+
+    #[tokio::test]
+    async fn test_tokenize_bytes_compact_output_keeps_u16_for_content_type() -> io::Result<()> {
+        let mut config = create_test_config(Some(ContentType::Text));
+        config.compact_output = true;
+        assert_eq!(config.output_token_width(), 2);
+        let result = tokenize_bytes(&config, b"a").await?;
+        assert_eq!(result, vec![2, 0xFF, 0x01, 0, 97]);
+        Ok(())
+    }
+
+    #[test]
+    fn test_output_token_width_with_merges() {
+        let mut config = create_test_config(None);
+        config.compact_output = true;
+        config.bpe_data = Some(Arc::new(HashMap::from([((97, 98), 256)])));
+        assert_eq!(config.output_token_width(), 2);
+        config.compact_output = false;
+        config.bpe_data = None;
+        assert_eq!(config.output_token_width(), 2);
+    }
+
+    #[tokio::test]
+    async fn test_word_level_bpe_is_opt_in() -> io::Result<()> {
+        // 'b' ' ' -> 256 only applies when merges may cross word boundaries.
+        let mut config = create_test_config(Some(ContentType::Text));
+        config.bpe_data = Some(Arc::new(HashMap::from([((98, 32), 256)])));
+        let result = tokenize_bytes(&config, b"b a").await?;
+        assert_eq!(result, vec![0xFF, 0x01, 1, 0, 0, 97]);
+
+        config.word_level_bpe = true;
+        let result = tokenize_bytes(&config, b"b a").await?;
+        assert_eq!(result, vec![0xFF, 0x01, 0, 98, 0, 32, 0, 97]);
+        Ok(())
+    }
+
+    #[tokio::test]
+    async fn test_shared_strategy_matches_per_call_strategy() -> io::Result<()> {
+        let mut config = create_test_config(Some(ContentType::Text));
+        config.bpe_data = Some(Arc::new(HashMap::from([((97, 98), 256)])));
+        config.word_level_bpe = true;
+        let strategy = select_strategy(&config);
+        let data = b"ab cab ab";
+        let expected = tokenize_bytes(&config, data).await?;
+        for _ in 0..2 {
+            let result = tokenize_bytes_with_strategy(&config, Arc::clone(&strategy), data).await?;
+            assert_eq!(result, expected);
+        }
+        Ok(())
+    }
+
+    #[tokio::test]
+    async fn test_tokenize_bytes_empty_input() -> io::Result<()> {
+        let config = create_test_config(None);
+        let result = tokenize_bytes(&config, b"").await?;
+        assert!(result.is_empty());
+        Ok(())
     }
-    Ok(())
 }
@@ -0,0 +1,207 @@
+//! This module is internal to `blt_core` and provides the lookup table used by the BPE encoder.
+//!
+//! It is not intended for direct use by external crates.
+//!
+//! [`MergeTable`] is built once per strategy from the shared `BpeMerges` map and picks a
+//! representation suited to its size, so the encoder's inner loop never pays for a layout
+//! that does not fit the vocabulary.
+
+use crate::BpeMerges;
+use std::sync::Arc;
+
+/// Tables with at most this many merges are searched linearly instead of hashed.
+pub(crate) const SMALL_TABLE_MAX_LEN: usize = 16;
+
+/// Number of possible pairs of byte tokens.
+const BYTE_PAIR_COUNT: usize = 256 * 256;
+
+/// Marks a byte pair without a merge rule in the dense table.
+///
+/// Vocabularies that merge into this ID are kept in [`MergeTable::Map`].
+const NO_TOKEN: u16 = u16::MAX;
+
+/// A read-only map from a pair of adjacent tokens to the token they merge into.
+pub(crate) enum MergeTable {
+    /// A handful of merges, kept inline and compared one by one.
+    Small(SmallMergeTable),
+    /// Byte pairs resolved by a direct index into a dense array, other pairs by hash.
+    Dense(DenseMergeTable),
+    /// Merges looked up in the shared hash map, used when a merge produces `u16::MAX`.
+    Map(Arc<BpeMerges>),
+}
+
+impl MergeTable {
+    /// Builds the table best suited to the size of `bpe_merges`.
+    pub(crate) fn new(bpe_merges: Arc<BpeMerges>) -> Self {
+        if bpe_merges.values().any(|&token| token == NO_TOKEN) {
+            MergeTable::Map(bpe_merges)
+        } else if bpe_merges.len() <= SMALL_TABLE_MAX_LEN {
+            MergeTable::Small(SmallMergeTable::new(&bpe_merges))
+        } else {
+            MergeTable::Dense(DenseMergeTable::new(bpe_merges))
+        }
+    }
+
+    /// Returns whether every merged token is below `u16::MAX`.
+    ///
+    /// The encoder then stores pair ranks as `u16`, using `u16::MAX` to mean "no merge".
+    #[inline]
+    pub(crate) fn has_narrow_tokens(&self) -> bool {
+        !matches!(self, MergeTable::Map(_))
+    }
+
+    /// Returns the token that `first` and `second` merge into, if there is a rule for them.
+    #[inline]
+    pub(crate) fn get(&self, first: u16, second: u16) -> Option<u16> {
+        match self {
+            MergeTable::Small(table) => table.get(first, second),
+            MergeTable::Dense(table) => table.get(first, second),
+            MergeTable::Map(map) => map.get(&(first, second)).copied(),
+        }
+    }
+}
+
+/// Up to [`SMALL_TABLE_MAX_LEN`] merges stored as packed pair keys in a fixed-size array.
+///
+/// For tiny vocabularies a linear scan over one or two cache lines is cheaper than hashing
+/// the pair, and the fixed capacity lets the compiler unroll the comparison loop.
+pub(crate) struct SmallMergeTable {
+    keys: [u32; SMALL_TABLE_MAX_LEN],
+    tokens: [u16; SMALL_TABLE_MAX_LEN],
+    len: usize,
+}
+
+impl SmallMergeTable {
+    fn new(bpe_merges: &BpeMerges) -> Self {
+        let mut table = SmallMergeTable {
+            keys: [0; SMALL_TABLE_MAX_LEN],
+            tokens: [0; SMALL_TABLE_MAX_LEN],
+            len: 0,
+        };
+        for (&(first, second), &token) in bpe_merges.iter().take(SMALL_TABLE_MAX_LEN) {
+            table.keys[table.len] = pair_key(first, second);
+            table.tokens[table.len] = token;
+            table.len += 1;
+        }
+        table
+    }
+
+    #[inline]
+    fn get(&self, first: u16, second: u16) -> Option<u16> {
+        let key = pair_key(first, second);
+        self.keys[..self.len]
+            .iter()
+            .position(|&candidate| candidate == key)
+            .map(|i| self.tokens[i])
+    }
+}
+
+/// Merges of two byte tokens stored in a 64K-entry array indexed by `first * 256 + second`.
+///
+/// Byte pairs are the most frequently looked-up pairs, since every input starts as bytes;
+/// they cost a single load with no hashing. Pairs involving merged tokens fall back to the
+/// shared hash map.
+pub(crate) struct DenseMergeTable {
+    byte_pairs: Box<[u16; BYTE_PAIR_COUNT]>,
+    merges: Arc<BpeMerges>,
+}
+
+impl DenseMergeTable {
+    fn new(merges: Arc<BpeMerges>) -> Self {
+        let mut byte_pairs: Box<[u16; BYTE_PAIR_COUNT]> = vec![NO_TOKEN; BYTE_PAIR_COUNT]
+            .into_boxed_slice()
+            .try_into()
+            .expect("vector has exactly BYTE_PAIR_COUNT entries");
+        for (&(first, second), &token) in merges.iter() {
+            if let Some(index) = byte_pair_index(first, second) {
+                byte_pairs[index] = token;
+            }
+        }
+        DenseMergeTable { byte_pairs, merges }
+    }
+
+    #[inline]
+    fn get(&self, first: u16, second: u16) -> Option<u16> {
+        match byte_pair_index(first, second) {
+            Some(index) => Some(self.byte_pairs[index]).filter(|&token| token != NO_TOKEN),
+            None => self.merges.get(&(first, second)).copied(),
+        }
+    }
+}
+
+/// Returns the dense table index of a pair of byte tokens, or `None` for other pairs.
+#[inline]
+fn byte_pair_index(first: u16, second: u16) -> Option<usize> {
+    if first < 256 && second < 256 {
+        Some(usize::from(first) << 8 | usize::from(second))
+    } else {
+        None
+    }
+}
+
+/// Packs a pair of tokens into a single comparable key.
+#[inline]
+fn pair_key(first: u16, second: u16) -> u32 {
+    (u32::from(first) << 16) | u32::from(second)
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn merges_with_len(len: u16) -> BpeMerges {
+        (0..len).map(|i| ((i, i + 1), 256 + i)).collect()
+    }
+
+    fn assert_matches_map(table: &MergeTable, merges: &BpeMerges) {
+        for first in 0..40 {
+            for second in 0..40 {
+                assert_eq!(
+                    table.get(first, second),
+                    merges.get(&(first, second)).copied(),
+                    "pair ({first}, {second})"
+                );
+            }
+        }
+    }
+
+    #[test]
+    fn test_small_table_is_used_up_to_limit() {
+        let merges = merges_with_len(SMALL_TABLE_MAX_LEN as u16);
+        let table = MergeTable::new(Arc::new(merges.clone()));
+        assert!(matches!(table, MergeTable::Small(_)));
+        assert!(table.has_narrow_tokens());
+        assert_matches_map(&table, &merges);
+    }
+
+    #[test]
+    fn test_dense_table_above_limit() {
+        let mut merges = merges_with_len(SMALL_TABLE_MAX_LEN as u16 + 1);
+        merges.insert((256, 257), 300);
+        merges.insert((3, 256), 301);
+        let table = MergeTable::new(Arc::new(merges.clone()));
+        assert!(matches!(table, MergeTable::Dense(_)));
+        assert!(table.has_narrow_tokens());
+        assert_matches_map(&table, &merges);
+        assert_eq!(table.get(256, 257), Some(300));
+        assert_eq!(table.get(255, 255), None);
+    }
+
+    #[test]
+    fn test_map_table_when_a_merge_uses_the_sentinel_token() {
+        for len in [1, SMALL_TABLE_MAX_LEN as u16 + 1] {
+            let mut merges = merges_with_len(len);
+            merges.insert((1, 1), NO_TOKEN);
+            let table = MergeTable::new(Arc::new(merges.clone()));
+            assert!(matches!(table, MergeTable::Map(_)));
+            assert!(!table.has_narrow_tokens());
+            assert_matches_map(&table, &merges);
+        }
+    }
+
+    #[test]
+    fn test_empty_table() {
+        let table = MergeTable::new(Arc::new(BpeMerges::new()));
+        assert_eq!(table.get(0, 0), None);
+    }
+}
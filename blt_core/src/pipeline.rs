@@ -9,7 +9,9 @@
 //! It handles reading from an input source, spawning parallel tasks for tokenization,
 //! and writing the ordered results to an output sink.
 
+use crate::chunking;
 use crate::io_handler::{self, InputSource, OutputWriter};
+use crate::pretokenizer;
 use crate::tokenizer::TokenizationStrategy;
 use std::collections::HashMap;
 use std::io;
@@ -29,8 +31,18 @@ pub(crate) async fn run(
 ) -> io::Result<()> {
     match input_source {
         InputSource::Mmap(mmap) => {
-            run_mmap_pipeline(
-                mmap,
+            run_slice_pipeline(
+                Arc::new(mmap),
+                output_writer,
+                effective_chunk_size,
+                num_threads,
+                strategy,
+            )
+            .await
+        }
+        InputSource::Buffer(buffer) => {
+            run_slice_pipeline(
+                Arc::new(buffer),
                 output_writer,
                 effective_chunk_size,
                 num_threads,
@@ -51,43 +63,59 @@ pub(crate) async fn run(
     }
 }
 
-// --- Mmap Pipeline ---
+/// Runs the tokenization strategy over an in-memory buffer, appending to `output`.
+///
+/// Chunks are processed in order using the same chunk boundaries as the file
+/// pipelines, so the result is identical to tokenizing the same bytes from a file.
+pub(crate) async fn run_in_memory(
+    data: &[u8],
+    output: &mut Vec<u8>,
+    effective_chunk_size: usize,
+    strategy: Arc<dyn TokenizationStrategy>,
+) -> io::Result<()> {
+    let chunks =
+        chunking::split_into_chunks(data, effective_chunk_size, strategy.aligns_to_words());
+    for (start, len) in chunks {
+        output.extend_from_slice(&strategy.process_chunk(&data[start..start + len]).await?);
+    }
+    Ok(())
+}
+
+// --- Slice Pipeline (for memory-mapped and buffered files) ---
+
+/// File contents that every worker task can slice into by offset.
+///
+/// Backed by either a memory map (large files) or an owned buffer (small files).
+type SharedInput = Arc<dyn AsRef<[u8]> + Send + Sync>;
 
-async fn run_mmap_pipeline(
-    mmap: memmap2::Mmap,
+async fn run_slice_pipeline(
+    input: SharedInput,
     mut output_writer: OutputWriter,
     effective_chunk_size: usize,
     num_threads: usize,
     strategy: Arc<dyn TokenizationStrategy>,
 ) -> io::Result<()> {
+    let data: &[u8] = (*input).as_ref();
     info!(
-        "Running pipeline in Mmap mode for file of size: {}",
-        mmap.len()
+        "Running pipeline in slice mode for input of size: {}",
+        data.len()
     );
-    let mmap_arc = Arc::new(mmap);
     let (results_tx, mut results_rx) = mpsc::channel(num_threads * 2);
     let mut dispatched_task_handles = HashMap::new();
     let mut received_results = HashMap::new();
     let mut current_expected_chunk_id = 0;
 
-    let chunks: Vec<(usize, usize)> = mmap_arc
-        .chunks(effective_chunk_size)
-        .enumerate()
-        .map(|(i, chunk)| {
-            let start = i * effective_chunk_size;
-            let len = chunk.len();
-            (start, len)
-        })
-        .collect();
+    let chunks =
+        chunking::split_into_chunks(data, effective_chunk_size, strategy.aligns_to_words());
 
     let mut chunk_iter = chunks.into_iter().enumerate();
 
     loop {
         while dispatched_task_handles.len() < num_threads {
             if let Some((task_id, (start, len))) = chunk_iter.next() {
-                let handle = spawn_mmap_chunk_task(
+                let handle = spawn_slice_chunk_task(
                     task_id,
-                    mmap_arc.clone(),
+                    input.clone(),
                     start,
                     len,
                     strategy.clone(),
@@ -105,10 +133,10 @@ async fn run_mmap_pipeline(
         }
 
         if let Some((task_id, result)) = results_rx.recv().await {
-            debug!(task_id, "Received result for mmap task");
+            debug!(task_id, "Received result for slice task");
             dispatched_task_handles.remove(&task_id);
             received_results.insert(task_id, result);
-            write_ordered_mmap_results(
+            write_ordered_slice_results(
                 &mut received_results,
                 &mut current_expected_chunk_id,
                 &mut output_writer,
@@ -119,7 +147,7 @@ async fn run_mmap_pipeline(
         }
     }
 
-    finalize_mmap_results(
+    finalize_slice_results(
         &mut received_results,
         &mut current_expected_chunk_id,
         &mut output_writer,
@@ -130,9 +158,9 @@ async fn run_mmap_pipeline(
     Ok(())
 }
 
-async fn spawn_mmap_chunk_task(
+async fn spawn_slice_chunk_task(
     task_id: usize,
-    mmap_arc: Arc<memmap2::Mmap>,
+    input: SharedInput,
     start: usize,
     len: usize,
     strategy: Arc<dyn TokenizationStrategy>,
@@ -140,17 +168,17 @@ async fn spawn_mmap_chunk_task(
 ) -> tokio::task::JoinHandle<()> {
     tokio::spawn(
         async move {
-            let chunk_slice = &mmap_arc[start..start + len];
-            let result = strategy.process_chunk(chunk_slice).await;
+            let data: &[u8] = (*input).as_ref();
+            let result = strategy.process_chunk(&data[start..start + len]).await;
             if results_tx.send((task_id, result)).await.is_err() {
-                error!(task_id, "Failed to send mmap result: receiver dropped.");
+                error!(task_id, "Failed to send slice result: receiver dropped.");
             }
         }
-        .instrument(info_span!("process_mmap_chunk_task", task_id)),
+        .instrument(info_span!("process_slice_chunk_task", task_id)),
     )
 }
 
-async fn write_ordered_mmap_results(
+async fn write_ordered_slice_results(
     received_results: &mut HashMap<usize, io::Result<Vec<u8>>>,
     current_expected_chunk_id: &mut usize,
     output_writer: &mut OutputWriter,
@@ -167,7 +195,7 @@ async fn write_ordered_mmap_results(
     Ok(())
 }
 
-async fn finalize_mmap_results(
+async fn finalize_slice_results(
     received_results: &mut HashMap<usize, io::Result<Vec<u8>>>,
     current_expected_chunk_id: &mut usize,
     output_writer: &mut OutputWriter,
@@ -248,6 +276,9 @@ struct ProcessingContext {
     received_results: HashMap<usize, io::Result<Vec<u8>>>,
     current_expected_chunk_id: usize,
     input_eof: bool,
+    /// The bytes after the last split point of the last read, held back for word-aligned
+    /// strategies and prepended to the next read.
+    carry: Vec<u8>,
 }
 
 impl ProcessingContext {
@@ -258,6 +289,7 @@ impl ProcessingContext {
             received_results: HashMap::new(),
             current_expected_chunk_id: 0,
             input_eof: false,
+            carry: Vec::new(),
         }
     }
     fn is_work_done(&self) -> bool {
@@ -300,6 +332,11 @@ async fn manage_task_spawning(
 }
 
 /// Reads a single chunk and spawns a processing task for it.
+///
+/// For strategies that align to words, everything after the last split point of each read
+/// is held back and prepended to the next one, so chunks end on the same split points
+/// however the stream happens to be split into reads. Long words are cut at piece ends, so
+/// the carry is always shorter than one piece.
 async fn try_read_and_spawn_task(
     context: &mut ProcessingContext,
     input_reader: &mut io_handler::InputReader,
@@ -307,22 +344,36 @@ async fn try_read_and_spawn_task(
     strategy: Arc<dyn TokenizationStrategy>,
     results_tx: mpsc::Sender<(usize, io::Result<Vec<u8>>)>,
 ) -> io::Result<bool> {
-    let mut chunk_buffer = vec![0; effective_chunk_size];
-    let bytes_read = input_reader.read(&mut chunk_buffer).await?;
+    let mut chunk_buffer = std::mem::take(&mut context.carry);
+    let carried = chunk_buffer.len();
+    chunk_buffer.resize(carried + effective_chunk_size, 0);
+    let bytes_read = input_reader.read(&mut chunk_buffer[carried..]).await?;
+    chunk_buffer.truncate(carried + bytes_read);
 
     if bytes_read == 0 {
         context.input_eof = true;
         debug!("Input stream reached EOF");
-        return Ok(false);
+        if chunk_buffer.is_empty() {
+            return Ok(false);
+        }
+    } else if strategy.aligns_to_words() {
+        // The carry holds no split point after its first byte, so only new bytes are searched.
+        match pretokenizer::last_split_point(&chunk_buffer, carried) {
+            Some(boundary) => context.carry = chunk_buffer.split_off(boundary),
+            None => {
+                // No split point yet; keep reading until one appears or the input ends.
+                context.carry = chunk_buffer;
+                return Ok(true);
+            }
+        }
     }
-    chunk_buffer.truncate(bytes_read);
 
     let task_id = context.next_chunk_id;
     context.next_chunk_id += 1;
 
     debug!(
         task_id,
-        bytes = bytes_read,
+        bytes = chunk_buffer.len(),
         "Spawning chunk processing task"
     );
     let handle = spawn_chunk_processing_task(task_id, chunk_buffer, strategy, results_tx);
@@ -431,3 +482,110 @@ async fn finalize_results(
     write_ordered_results(context, output_writer).await?; // Final check
     Ok(())
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::tokenizer::TextBpeStrategy;
+    use crate::BpeMerges;
+    use std::pin::Pin;
+    use std::task::{Context, Poll};
+    use tokio::io::{AsyncRead, ReadBuf};
+
+    /// A reader that returns at most `step` bytes per read, like a slow pipe.
+    struct TrickleReader {
+        data: Vec<u8>,
+        pos: usize,
+        step: usize,
+    }
+
+    impl AsyncRead for TrickleReader {
+        fn poll_read(
+            mut self: Pin<&mut Self>,
+            _cx: &mut Context<'_>,
+            buf: &mut ReadBuf<'_>,
+        ) -> Poll<io::Result<()>> {
+            let end = (self.pos + self.step)
+                .min(self.data.len())
+                .min(self.pos + buf.remaining());
+            buf.put_slice(&self.data[self.pos..end]);
+            self.pos = end;
+            Poll::Ready(Ok(()))
+        }
+    }
+
+    fn text_strategy() -> Arc<dyn TokenizationStrategy> {
+        let mut merges = BpeMerges::new();
+        merges.insert((b'a' as u16, b'b' as u16), 256);
+        merges.insert((256, b'c' as u16), 257);
+        merges.insert((b' ' as u16, b'a' as u16), 258);
+        Arc::new(TextBpeStrategy::new(Arc::new(merges), 16))
+    }
+
+    /// Text with a delimiter-free run several pieces long in the middle.
+    fn long_word_input() -> Vec<u8> {
+        let mut data = b"abc ab ".to_vec();
+        data.resize(
+            data.len() + 3 * pretokenizer::MAX_ENCODED_WORD_LEN + 17,
+            b'a',
+        );
+        data.extend_from_slice(b"bc abc\tab");
+        data
+    }
+
+    /// Runs the stream pipeline over `data`, delivered `step` bytes per read.
+    async fn run_stream(
+        data: &[u8],
+        step: usize,
+        chunk_size: usize,
+        strategy: Arc<dyn TokenizationStrategy>,
+    ) -> io::Result<Vec<u8>> {
+        let reader = TrickleReader {
+            data: data.to_vec(),
+            pos: 0,
+            step,
+        };
+        let (writer, mut output) = tokio::io::duplex(1 << 16);
+        let collector = tokio::spawn(async move {
+            let mut actual = Vec::new();
+            output.read_to_end(&mut actual).await.map(|_| actual)
+        });
+        run_stream_pipeline(Box::new(reader), Box::new(writer), chunk_size, 2, strategy).await?;
+        collector.await.map_err(io::Error::other)?
+    }
+
+    #[tokio::test]
+    async fn test_stream_pipeline_keeps_words_whole_across_reads() -> io::Result<()> {
+        let strategy = text_strategy();
+        let data = b"abc ab\tabcabc x\nabc".repeat(8);
+
+        let mut expected = Vec::new();
+        run_in_memory(&data, &mut expected, 64, Arc::clone(&strategy)).await?;
+
+        assert_eq!(run_stream(&data, 3, 4, strategy).await?, expected);
+        Ok(())
+    }
+
+    #[tokio::test]
+    async fn test_stream_pipeline_splits_long_words_at_piece_ends() -> io::Result<()> {
+        let strategy = text_strategy();
+        let data = long_word_input();
+        let expected = strategy.process_chunk(&data).await?;
+
+        assert_eq!(run_stream(&data, 1000, 4096, strategy).await?, expected);
+        Ok(())
+    }
+
+    #[tokio::test]
+    async fn test_in_memory_splits_long_words_at_piece_ends() -> io::Result<()> {
+        let strategy = text_strategy();
+        let data = long_word_input();
+        let expected = strategy.process_chunk(&data).await?;
+        assert!(chunking::split_into_chunks(&data, 4096, true).len() > 1);
+
+        let mut actual = Vec::new();
+        run_in_memory(&data, &mut actual, 4096, strategy).await?;
+        assert_eq!(actual, expected);
+        Ok(())
+    }
+}
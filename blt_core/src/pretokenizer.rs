@@ -0,0 +1,203 @@
+//! This module is internal to `blt_core` and splits text into words before BPE is applied.
+//!
+//! It is not intended for direct use by external crates.
+//!
+//! A new word starts at every delimiter byte (space, newline or tab), so each word is an
+//! optional leading delimiter followed by a run of non-delimiter bytes. For example,
+//! `"hello world"` is split into `"hello"` and `" world"`. Merges are never applied across
+//! word boundaries, which makes each word an independent unit of work.
+//!
+//! Words longer than [`MAX_ENCODED_WORD_LEN`] are further split into pieces counted from the
+//! start of the word. Word boundaries and piece ends are both *split points*: input may be
+//! cut at any of them without changing word-level output.
+
+/// Bytes that start a new word.
+pub(crate) const WORD_DELIMITERS: [u8; 3] = [b' ', b'\n', b'\t'];
+
+/// Words longer than this, usually binary data without delimiters, are encoded in pieces
+/// of this length. The rank-order encoder needs about 32 bytes per input byte, so this
+/// bounds its working set to 2MB per worker.
+pub(crate) const MAX_ENCODED_WORD_LEN: usize = 64 * 1024;
+
+/// Returns an iterator over the words of `data`.
+pub(crate) fn split_words(data: &[u8]) -> Words<'_> {
+    Words { rest: data }
+}
+
+/// Iterator over the words of a byte slice, created by [`split_words`].
+pub(crate) struct Words<'a> {
+    rest: &'a [u8],
+}
+
+impl<'a> Iterator for Words<'a> {
+    type Item = &'a [u8];
+
+    fn next(&mut self) -> Option<&'a [u8]> {
+        if self.rest.is_empty() {
+            return None;
+        }
+        let (word, rest) = self.rest.split_at(word_boundary_at_or_after(self.rest, 1));
+        self.rest = rest;
+        Some(word)
+    }
+}
+
+/// Returns the first word boundary at or after `pos`, or `data.len()` if there is none.
+///
+/// A word boundary is the offset of a delimiter byte, since every delimiter starts a new word.
+pub(crate) fn word_boundary_at_or_after(data: &[u8], pos: usize) -> usize {
+    if pos >= data.len() {
+        return data.len();
+    }
+    find_delimiter(&data[pos..]).map_or(data.len(), |i| pos + i)
+}
+
+/// Returns the first split point at or after `pos`, or `data.len()` if there is none.
+///
+/// `start` must itself be a split point at or before `pos`; it is where the pieces of a word
+/// that began earlier are counted from. Only `data[start..]` is scanned.
+pub(crate) fn split_point_at_or_after(data: &[u8], start: usize, pos: usize) -> usize {
+    if pos >= data.len() {
+        return data.len();
+    }
+    let [a, b, c] = WORD_DELIMITERS;
+    let word_start = memchr::memrchr3(a, b, c, &data[start..=pos]).map_or(start, |i| start + i);
+    let piece_end =
+        word_start + (pos - word_start).div_ceil(MAX_ENCODED_WORD_LEN) * MAX_ENCODED_WORD_LEN;
+    word_boundary_at_or_after(data, pos).min(piece_end)
+}
+
+/// Returns the last split point in `data` after its first byte, or `None` if there is none.
+///
+/// `data` must start at a split point, and `data[..from]` must contain no delimiter after
+/// its first byte. Only `data[from..]` is scanned, so a buffer that grows by appending can
+/// be searched in linear time overall.
+pub(crate) fn last_split_point(data: &[u8], from: usize) -> Option<usize> {
+    let [a, b, c] = WORD_DELIMITERS;
+    let word_start = memchr::memrchr3(a, b, c, &data[from..]).map_or(0, |i| from + i);
+    let pieces = (data.len() - word_start) / MAX_ENCODED_WORD_LEN;
+    Some(word_start + pieces * MAX_ENCODED_WORD_LEN).filter(|&end| end > 0)
+}
+
+/// Returns the offset of the first delimiter byte in `data`, if any.
+///
+/// Uses `memchr3`, which compares many bytes per instruction with SIMD where available.
+fn find_delimiter(data: &[u8]) -> Option<usize> {
+    let [a, b, c] = WORD_DELIMITERS;
+    memchr::memchr3(a, b, c, data)
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn words(data: &[u8]) -> Vec<&[u8]> {
+        split_words(data).collect()
+    }
+
+    #[test]
+    fn test_split_words_simple() {
+        assert_eq!(words(b"hello world"), vec![&b"hello"[..], b" world"]);
+    }
+
+    #[test]
+    fn test_split_words_mixed_delimiters() {
+        assert_eq!(words(b"a\tb\nc d"), vec![&b"a"[..], b"\tb", b"\nc", b" d"]);
+    }
+
+    #[test]
+    fn test_split_words_repeated_delimiters() {
+        assert_eq!(words(b"a  b"), vec![&b"a"[..], b" ", b" b"]);
+    }
+
+    #[test]
+    fn test_split_words_leading_and_trailing_delimiters() {
+        assert_eq!(words(b" a "), vec![&b" a"[..], b" "]);
+    }
+
+    #[test]
+    fn test_split_words_empty() {
+        assert!(words(b"").is_empty());
+    }
+
+    #[test]
+    fn test_split_words_no_delimiters() {
+        assert_eq!(words(b"abc"), vec![&b"abc"[..]]);
+    }
+
+    #[test]
+    fn test_word_boundary_at_or_after() {
+        let data = b"ab cd\tef";
+        assert_eq!(word_boundary_at_or_after(data, 0), 2);
+        assert_eq!(word_boundary_at_or_after(data, 2), 2);
+        assert_eq!(word_boundary_at_or_after(data, 3), 5);
+        assert_eq!(word_boundary_at_or_after(data, 6), data.len());
+        assert_eq!(word_boundary_at_or_after(data, 100), data.len());
+    }
+
+    #[test]
+    fn test_split_point_at_or_after() {
+        let data = b"ab cd\tef";
+        assert_eq!(split_point_at_or_after(data, 0, 1), 2);
+        assert_eq!(split_point_at_or_after(data, 2, 3), 5);
+        assert_eq!(split_point_at_or_after(data, 5, 6), data.len());
+
+        // The long word starts at its leading space, so its pieces are counted from there.
+        let mut long = b"ab ".to_vec();
+        long.resize(2 + 2 * MAX_ENCODED_WORD_LEN + 2, b'x');
+        long.extend_from_slice(b" z");
+        let first_piece_end = 2 + MAX_ENCODED_WORD_LEN;
+        let second_piece_end = 2 + 2 * MAX_ENCODED_WORD_LEN;
+        assert_eq!(split_point_at_or_after(&long, 0, 10), first_piece_end);
+        assert_eq!(
+            split_point_at_or_after(&long, first_piece_end, first_piece_end + 1),
+            second_piece_end
+        );
+        assert_eq!(
+            split_point_at_or_after(&long, second_piece_end, second_piece_end + 1),
+            long.len() - 2
+        );
+    }
+
+    #[test]
+    fn test_last_split_point() {
+        assert_eq!(last_split_point(b"ab cd\tef", 0), Some(5));
+        assert_eq!(last_split_point(b"ab cd ", 0), Some(5));
+        assert_eq!(last_split_point(b"ab cd ", 2), Some(5));
+        assert_eq!(last_split_point(b" abc", 0), None);
+        assert_eq!(last_split_point(b"abc", 0), None);
+        assert_eq!(last_split_point(b"", 0), None);
+    }
+
+    #[test]
+    fn test_last_split_point_cuts_long_words_into_pieces() {
+        let mut data = b" ".to_vec();
+        data.resize(2 * MAX_ENCODED_WORD_LEN + 5, b'x');
+        assert_eq!(
+            last_split_point(&data, MAX_ENCODED_WORD_LEN),
+            Some(2 * MAX_ENCODED_WORD_LEN)
+        );
+        data.extend_from_slice(b"x yy");
+        assert_eq!(
+            last_split_point(&data, data.len() - 4),
+            Some(data.len() - 3)
+        );
+    }
+
+    #[test]
+    fn test_find_delimiter_matches_scalar_scan() {
+        let data: Vec<u8> = (0..1024u32).map(|i| (i * 37 % 127) as u8).collect();
+        for start in 0..data.len() {
+            let expected = data[start..]
+                .iter()
+                .position(|b| WORD_DELIMITERS.contains(b));
+            assert_eq!(find_delimiter(&data[start..]), expected);
+        }
+    }
+
+    #[test]
+    fn test_split_words_roundtrip() {
+        let data = b"The quick\tbrown\n\nfox  jumps ";
+        assert_eq!(words(data).concat(), data.to_vec());
+    }
+}
@@ -2,15 +2,29 @@
 //!
 //! This module provides the `TokenizationStrategy` trait, which allows for different
 //! tokenization algorithms to be used interchangeably within the processing pipeline.
-//! It includes a `BpeStrategy` for Byte-Pair Encoding and a `PassthroughStrategy`
-//! as a default no-op.
+//! It includes a `BpeStrategy` for Byte-Pair Encoding, a word-level `TextBpeStrategy`
+//! with a per-word encoding cache, and a `PassthroughStrategy` as a default no-op.
 
+use crate::bpe_encoder;
+use crate::merge_table::MergeTable;
+use crate::pretokenizer::{self, MAX_ENCODED_WORD_LEN};
 use crate::BpeMerges;
 use async_trait;
+use lru::LruCache;
 use std::io;
-use std::sync::Arc;
+use std::num::NonZeroUsize;
+use std::sync::{Arc, Mutex, MutexGuard, PoisonError};
 use tracing::{debug, instrument};
 
+/// Default number of words whose BPE encoding is cached by `TextBpeStrategy`.
+pub const DEFAULT_WORD_CACHE_CAPACITY: usize = 8192;
+
+/// Words longer than this are always encoded directly and never cached.
+const MAX_CACHED_WORD_LEN: usize = 64;
+
+/// Maximum number of independently locked shards in the word cache.
+const WORD_CACHE_SHARDS: usize = 16;
+
 // --- Tokenization Strategy Trait ---
 
 /// A trait that defines the interface for a tokenization algorithm.
@@ -28,16 +42,24 @@ pub trait TokenizationStrategy: Send + Sync {
     /// # Returns
     /// A `Result` containing the processed `Vec<u8>` on success, or an `io::Error` on failure.
     async fn process_chunk(&self, chunk_data: &[u8]) -> io::Result<Vec<u8>>;
+
+    /// Whether chunks handed to this strategy must end on a word boundary.
+    ///
+    /// Strategies that work on independent words return `true`, which lets the pipeline
+    /// split the input freely between workers without changing the output.
+    fn aligns_to_words(&self) -> bool {
+        false
+    }
 }
 
 // --- BPE Strategy Implementation ---
 
 /// A tokenization strategy that applies Byte-Pair Encoding (BPE).
 ///
-/// This strategy iteratively merges the most frequent pairs of bytes into new, single tokens
-/// based on a provided `merges` map.
+/// This strategy iteratively merges adjacent pairs of tokens into new, single tokens based on
+/// a provided `merges` map, in repeated left-to-right passes over the whole chunk.
 pub struct BpeStrategy {
-    bpe_merges: Arc<BpeMerges>,
+    merge_table: MergeTable,
 }
 
 impl BpeStrategy {
@@ -46,7 +68,9 @@ impl BpeStrategy {
     /// # Arguments
     /// * `bpe_merges` - An `Arc`-wrapped map of byte pairs to their resulting merged token.
     pub fn new(bpe_merges: Arc<BpeMerges>) -> Self {
-        Self { bpe_merges }
+        Self {
+            merge_table: MergeTable::new(bpe_merges),
+        }
     }
 }
 
@@ -58,39 +82,134 @@ impl TokenizationStrategy for BpeStrategy {
             return Ok(Vec::new());
         }
 
-        let mut tokens: Vec<u16> = chunk_data.iter().map(|&b| b as u16).collect();
-
-        loop {
-            let mut merges_found = false;
-            let mut new_tokens = Vec::with_capacity(tokens.len());
-            let mut i = 0;
-            while i < tokens.len() {
-                if i < tokens.len() - 1 {
-                    if let Some(&new_token) = self.bpe_merges.get(&(tokens[i], tokens[i + 1])) {
-                        new_tokens.push(new_token);
-                        i += 2;
-                        merges_found = true;
-                    } else {
-                        new_tokens.push(tokens[i]);
-                        i += 1;
-                    }
-                } else {
-                    new_tokens.push(tokens[i]);
-                    i += 1;
-                }
+        let tokens = bpe_encoder::encode_in_passes(chunk_data, &self.merge_table);
+        let mut output_bytes = Vec::with_capacity(tokens.len() * 2);
+        push_be_tokens(&mut output_bytes, &tokens);
+        Ok(output_bytes)
+    }
+}
+
+/// Appends `tokens` to `output` as big-endian `u16` values.
+fn push_be_tokens(output: &mut Vec<u8>, tokens: &[u16]) {
+    for token in tokens {
+        output.extend_from_slice(&token.to_be_bytes());
+    }
+}
+
+// --- Text BPE Strategy Implementation ---
+
+/// Maps a word's bytes to its BPE-encoded tokens.
+type WordCacheShard = LruCache<Vec<u8>, Vec<u16>>;
+
+/// A bounded cache of word encodings, split into independently locked LRU shards.
+///
+/// Every worker task consults the cache for every word, so a single lock would serialize
+/// the pipeline; with shards, workers only contend when they hit the same shard at once.
+struct WordCache {
+    shards: Box<[Mutex<WordCacheShard>]>,
+}
+
+impl WordCache {
+    /// Creates a cache holding about `capacity` words, or `None` if `capacity` is `0`.
+    fn new(capacity: usize) -> Option<Self> {
+        let shard_count = capacity.min(WORD_CACHE_SHARDS);
+        let shard_capacity = NonZeroUsize::new(capacity.div_ceil(shard_count.max(1)))?;
+        let shards = (0..shard_count)
+            .map(|_| Mutex::new(LruCache::new(shard_capacity)))
+            .collect();
+        Some(Self { shards })
+    }
+
+    /// Locks the shard responsible for `word`, recovering from poisoning since entries
+    /// are always complete.
+    fn shard(&self, word: &[u8]) -> MutexGuard<'_, WordCacheShard> {
+        let index = (fnv1a(word) % self.shards.len() as u64) as usize;
+        self.shards[index]
+            .lock()
+            .unwrap_or_else(PoisonError::into_inner)
+    }
+}
+
+/// Hashes `data` with 64-bit FNV-1a, which is cheap for the short words the cache holds.
+fn fnv1a(data: &[u8]) -> u64 {
+    data.iter().fold(0xcbf2_9ce4_8422_2325, |hash, &byte| {
+        (hash ^ u64::from(byte)).wrapping_mul(0x0000_0100_0000_01b3)
+    })
+}
+
+/// A word-level BPE strategy for text content.
+///
+/// The chunk is first split into words (see `pretokenizer`), and merges are applied within
+/// each word only. Because words are independent, the encoding of recently seen words is kept
+/// in a bounded, sharded LRU cache, so repeated content such as logs or templated text skips
+/// the merge loop entirely. The cache lives as long as the strategy, so sharing one strategy
+/// across runs (see `select_strategy`) keeps it warm between calls.
+pub struct TextBpeStrategy {
+    merge_table: MergeTable,
+    word_cache: Option<WordCache>,
+}
+
+impl TextBpeStrategy {
+    /// Creates a new `TextBpeStrategy`.
+    ///
+    /// # Arguments
+    /// * `bpe_merges` - An `Arc`-wrapped map of byte pairs to their resulting merged token.
+    /// * `cache_capacity` - Maximum number of cached word encodings; `0` disables the cache.
+    pub fn new(bpe_merges: Arc<BpeMerges>, cache_capacity: usize) -> Self {
+        Self {
+            merge_table: MergeTable::new(bpe_merges),
+            word_cache: WordCache::new(cache_capacity),
+        }
+    }
+
+    /// Encodes a single word and appends its tokens to `output`, consulting the cache first.
+    fn encode_word_into(&self, word: &[u8], output: &mut Vec<u8>) -> io::Result<()> {
+        match &self.word_cache {
+            Some(cache) if word.len() <= MAX_CACHED_WORD_LEN => {
+                self.encode_cached_word_into(cache, word, output)
             }
-            tokens = new_tokens;
-            if !merges_found {
-                break;
+            _ => {
+                push_be_tokens(output, &bpe_encoder::encode(word, &self.merge_table)?);
+                Ok(())
             }
         }
+    }
 
-        let mut output_bytes = Vec::with_capacity(tokens.len() * 2);
-        for token in tokens {
-            output_bytes.extend_from_slice(&token.to_be_bytes());
+    fn encode_cached_word_into(
+        &self,
+        cache: &WordCache,
+        word: &[u8],
+        output: &mut Vec<u8>,
+    ) -> io::Result<()> {
+        if let Some(tokens) = cache.shard(word).get(word) {
+            push_be_tokens(output, tokens);
+            return Ok(());
+        }
+        // Merge outside the lock so other workers can keep hitting the shard.
+        let tokens = bpe_encoder::encode(word, &self.merge_table)?;
+        push_be_tokens(output, &tokens);
+        cache.shard(word).put(word.to_vec(), tokens);
+        Ok(())
+    }
+}
+
+#[async_trait::async_trait]
+impl TokenizationStrategy for TextBpeStrategy {
+    #[instrument(skip(self, chunk_data), name = "text_bpe_strategy_process")]
+    async fn process_chunk(&self, chunk_data: &[u8]) -> io::Result<Vec<u8>> {
+        let mut output_bytes = Vec::with_capacity(chunk_data.len() * 2);
+        for word in pretokenizer::split_words(chunk_data) {
+            // Chunks only split words at piece ends, so pieces always start at the same offsets.
+            for piece in word.chunks(MAX_ENCODED_WORD_LEN) {
+                self.encode_word_into(piece, &mut output_bytes)?;
+            }
         }
         Ok(output_bytes)
     }
+
+    fn aligns_to_words(&self) -> bool {
+        true
+    }
 }
 
 // --- Basic Tokenization Strategy (New Default) ---
@@ -244,6 +363,16 @@ mod tests {
         Ok(())
     }
 
+    #[tokio::test]
+    async fn test_bpe_strategy_merges_in_left_to_right_passes() -> io::Result<()> {
+        // The first pass merges 'a' + 'b' before it reaches 'b' + 'c', even though
+        // 'b' + 'c' has the lower merged token ID.
+        let strategy = create_bpe_strategy(vec![((98, 99), 256), ((97, 98), 257)]);
+        let result = strategy.process_chunk(b"abc").await?;
+        assert_eq!(result, u16_vec_to_byte_vec(&[257, 99]));
+        Ok(())
+    }
+
     #[tokio::test]
     async fn test_basic_tokenization_strategy() -> io::Result<()> {
         let strategy = BasicTokenizationStrategy;
@@ -279,6 +408,107 @@ mod tests {
         Ok(())
     }
 
+    fn create_text_bpe_strategy(
+        pairs: Vec<((u16, u16), u16)>,
+        cache_capacity: usize,
+    ) -> TextBpeStrategy {
+        let bpe_merges = Arc::new(pairs.into_iter().collect());
+        TextBpeStrategy::new(bpe_merges, cache_capacity)
+    }
+
+    #[tokio::test]
+    async fn test_text_bpe_strategy_merges_within_words() -> io::Result<()> {
+        let strategy = create_text_bpe_strategy(vec![((97, 98), 256), ((32, 97), 257)], 16);
+        let chunk = b"ab ab";
+        // " ab" is its own word: 'a' + 'b' (rank 256) wins over ' ' + 'a' (rank 257).
+        let expected_tokens = vec![256, 32, 256];
+
+        let result = strategy.process_chunk(chunk).await?;
+        assert_eq!(result, u16_vec_to_byte_vec(&expected_tokens));
+        Ok(())
+    }
+
+    #[tokio::test]
+    async fn test_text_bpe_strategy_does_not_merge_across_words() -> io::Result<()> {
+        let strategy = create_text_bpe_strategy(vec![((98, 32), 256)], 16);
+        let chunk = b"ab c";
+        let expected_tokens = u8_slice_to_u16_vec(b"ab c");
+
+        let result = strategy.process_chunk(chunk).await?;
+        assert_eq!(result, u16_vec_to_byte_vec(&expected_tokens));
+        Ok(())
+    }
+
+    #[tokio::test]
+    async fn test_text_bpe_strategy_cache_matches_uncached() -> io::Result<()> {
+        let pairs = vec![((97, 98), 256), ((256, 99), 257), ((32, 257), 258)];
+        let cached = create_text_bpe_strategy(pairs.clone(), 2);
+        let uncached = create_text_bpe_strategy(pairs, 0);
+        let chunk = b"abc abc abd\tabc abc\nxyz abc";
+
+        let first = cached.process_chunk(chunk).await?;
+        let second = cached.process_chunk(chunk).await?;
+        let expected = uncached.process_chunk(chunk).await?;
+        assert_eq!(first, expected);
+        assert_eq!(second, expected);
+        Ok(())
+    }
+
+    #[test]
+    fn test_word_cache_capacity_is_split_across_shards() {
+        assert!(WordCache::new(0).is_none());
+        let small = WordCache::new(3).unwrap();
+        assert_eq!(small.shards.len(), 3);
+        let large = WordCache::new(1000).unwrap();
+        assert_eq!(large.shards.len(), WORD_CACHE_SHARDS);
+        let total: usize = large
+            .shards
+            .iter()
+            .map(|s| s.lock().unwrap().cap().get())
+            .sum();
+        assert!((1000..1000 + WORD_CACHE_SHARDS).contains(&total));
+    }
+
+    #[tokio::test]
+    async fn test_text_bpe_strategy_cache_is_shared_across_concurrent_chunks() -> io::Result<()> {
+        let pairs = vec![((97, 98), 256), ((256, 99), 257)];
+        let strategy = Arc::new(create_text_bpe_strategy(pairs.clone(), 64));
+        let chunk: &[u8] = b"abc cab bca abc\tabcabc";
+        let expected = create_text_bpe_strategy(pairs, 0)
+            .process_chunk(chunk)
+            .await?;
+        let tasks: Vec<_> = (0..8)
+            .map(|_| {
+                let strategy = Arc::clone(&strategy);
+                tokio::spawn(async move { strategy.process_chunk(chunk).await })
+            })
+            .collect();
+        for task in tasks {
+            assert_eq!(task.await.map_err(io::Error::other)??, expected);
+        }
+        Ok(())
+    }
+
+    #[tokio::test]
+    async fn test_text_bpe_strategy_encodes_long_words_in_pieces() -> io::Result<()> {
+        let strategy = create_text_bpe_strategy(vec![((97, 97), 256)], 16);
+        let chunk = vec![b'a'; MAX_ENCODED_WORD_LEN + 1];
+        let mut expected = vec![256; MAX_ENCODED_WORD_LEN / 2];
+        expected.push(97);
+
+        let result = strategy.process_chunk(&chunk).await?;
+        assert_eq!(result, u16_vec_to_byte_vec(&expected));
+        Ok(())
+    }
+
+    #[tokio::test]
+    async fn test_text_bpe_strategy_empty_input() -> io::Result<()> {
+        let strategy = create_text_bpe_strategy(vec![((97, 98), 256)], 16);
+        let result = strategy.process_chunk(b"").await?;
+        assert!(result.is_empty());
+        Ok(())
+    }
+
     #[tokio::test]
     async fn test_bpe_strategy_merge_produces_byte_value() -> io::Result<()> {
         let strategy = create_bpe_strategy(vec![((120, 121), 90)]);
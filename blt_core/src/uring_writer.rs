@@ -0,0 +1,228 @@
+//! This module is internal to `blt_core` and writes file output through `io_uring` on Linux.
+//!
+//! It is not intended for direct use by external crates, and is only compiled with the
+//! `io-uring` feature on Linux.
+//!
+//! [`UringFile`] splits each large buffer into segments and keeps up to [`QUEUE_DEPTH`]
+//! positional writes in flight at once, so the device sees a deep queue instead of one
+//! `write` syscall at a time. Small buffers, and kernels without `io_uring` support, fall
+//! back to plain positional writes.
+
+use io_uring::{opcode, squeue, types, IoUring};
+use std::collections::VecDeque;
+use std::fs::File;
+use std::io::{self, Write};
+use std::os::unix::fs::FileExt;
+use std::os::unix::io::AsRawFd;
+
+/// Maximum number of writes submitted to the ring at once.
+const QUEUE_DEPTH: u32 = 32;
+
+/// Size of each write submitted to the ring.
+const SEGMENT_SIZE: usize = 128 * 1024; // 128KB
+
+/// Buffers smaller than this are written synchronously; a single `pwrite` is cheaper than
+/// a round trip through the ring.
+const URING_THRESHOLD_BYTES: usize = 1024 * 1024; // 1MB
+
+/// Index of the output file in the ring's registered file table.
+const FIXED_FILE_INDEX: u32 = 0;
+
+/// A file that writes large buffers as batches of concurrent `io_uring` writes.
+///
+/// All writes are positional, starting at the beginning of the file, so the file must be
+/// newly created or truncated.
+///
+/// If the ring itself fails while writes are in flight, the kernel may still be reading the
+/// buffer passed to `write_all` after it returns the error, so that buffer must never be
+/// reused or freed.
+pub(crate) struct UringFile {
+    file: File,
+    ring: Option<IoUring>,
+    fixed_file: bool,
+    offset: u64,
+}
+
+impl UringFile {
+    /// Wraps `file`, falling back to synchronous writes if a ring cannot be created.
+    pub(crate) fn new(file: File) -> Self {
+        let ring = IoUring::new(QUEUE_DEPTH).ok();
+        let fixed_file = ring
+            .as_ref()
+            .is_some_and(|ring| ring.submitter().register_files(&[file.as_raw_fd()]).is_ok());
+        Self {
+            file,
+            ring,
+            fixed_file,
+            offset: 0,
+        }
+    }
+
+    /// Stops using the ring after `io_uring_enter` has failed; later writes are synchronous.
+    ///
+    /// With writes still in flight, the ring is leaked rather than torn down, so the kernel
+    /// can finish them into queues that stay mapped.
+    fn abandon_ring(&mut self, in_flight: bool) {
+        let ring = self.ring.take();
+        if in_flight {
+            std::mem::forget(ring);
+        }
+    }
+
+    /// Builds a write of `data[start..end]` at the matching file offset.
+    fn write_entry(&self, data: &[u8], (start, end): (usize, usize)) -> squeue::Entry {
+        let buf = data[start..end].as_ptr();
+        let len = (end - start) as u32;
+        let offset = self.offset + start as u64;
+        if self.fixed_file {
+            opcode::Write::new(types::Fixed(FIXED_FILE_INDEX), buf, len)
+                .offset(offset)
+                .build()
+        } else {
+            opcode::Write::new(types::Fd(self.file.as_raw_fd()), buf, len)
+                .offset(offset)
+                .build()
+        }
+    }
+
+    /// Writes `data` through the ring, resubmitting the remainder of any short write.
+    ///
+    /// Every submitted write is reaped before returning, even after a write fails, so the
+    /// kernel never reads from `data` once it has been released. The one exception is a
+    /// failure of `io_uring_enter` itself: completions can then no longer be waited for, so
+    /// the ring is abandoned with any outstanding writes still pointing into `data`.
+    fn write_all_uring(&mut self, data: &[u8]) -> io::Result<()> {
+        let mut pending: VecDeque<(usize, usize)> = (0..data.len())
+            .step_by(SEGMENT_SIZE)
+            .map(|start| (start, (start + SEGMENT_SIZE).min(data.len())))
+            .collect();
+        let mut in_flight: Vec<Option<(usize, usize)>> = vec![None; QUEUE_DEPTH as usize];
+        let mut in_flight_count = 0;
+        let mut error: Option<io::Error> = None;
+
+        while in_flight_count > 0 || (error.is_none() && !pending.is_empty()) {
+            while error.is_none() && in_flight_count < in_flight.len() {
+                let Some(range) = pending.pop_front() else {
+                    break;
+                };
+                let slot = in_flight.iter().position(Option::is_none).unwrap_or(0);
+                let entry = self.write_entry(data, range).user_data(slot as u64);
+                let ring = self.ring.as_mut().expect("uring writes require a ring");
+                // SAFETY: `data` outlives the write, since every submitted entry is reaped
+                // before this function returns.
+                if unsafe { ring.submission().push(&entry) }.is_err() {
+                    error = Some(io::Error::other("io_uring submission queue is full"));
+                    break;
+                }
+                in_flight[slot] = Some(range);
+                in_flight_count += 1;
+            }
+            if in_flight_count == 0 {
+                break;
+            }
+
+            let ring = self.ring.as_mut().expect("uring writes require a ring");
+            let enter_result = ring.submit_and_wait(1);
+            for completion in ring.completion() {
+                let slot = completion.user_data() as usize;
+                let Some((start, end)) = in_flight[slot].take() else {
+                    continue;
+                };
+                in_flight_count -= 1;
+                match completion.result() {
+                    written if written < 0 => {
+                        error.get_or_insert(io::Error::from_raw_os_error(-written));
+                    }
+                    0 => {
+                        error.get_or_insert(io::Error::from(io::ErrorKind::WriteZero));
+                    }
+                    written if start + (written as usize) < end => {
+                        pending.push_front((start + written as usize, end));
+                    }
+                    _ => {}
+                }
+            }
+            match enter_result {
+                Err(e) if !is_retryable(&e) => {
+                    self.abandon_ring(in_flight_count > 0);
+                    return Err(error.unwrap_or(e));
+                }
+                _ => {}
+            }
+        }
+
+        match error {
+            Some(e) => Err(e),
+            None => {
+                self.offset += data.len() as u64;
+                Ok(())
+            }
+        }
+    }
+}
+
+/// Returns whether a failed `io_uring_enter` can simply be retried.
+///
+/// `EBUSY` means the completion queue is full, which reaping completions resolves.
+fn is_retryable(error: &io::Error) -> bool {
+    matches!(
+        error.kind(),
+        io::ErrorKind::Interrupted | io::ErrorKind::WouldBlock
+    ) || error.raw_os_error() == Some(libc::EBUSY)
+}
+
+impl Write for UringFile {
+    fn write(&mut self, buf: &[u8]) -> io::Result<usize> {
+        let written = self.file.write_at(buf, self.offset)?;
+        self.offset += written as u64;
+        Ok(written)
+    }
+
+    fn write_all(&mut self, buf: &[u8]) -> io::Result<()> {
+        if self.ring.is_some() && buf.len() >= URING_THRESHOLD_BYTES {
+            return self.write_all_uring(buf);
+        }
+        self.file.write_all_at(buf, self.offset)?;
+        self.offset += buf.len() as u64;
+        Ok(())
+    }
+
+    fn flush(&mut self) -> io::Result<()> {
+        Ok(())
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use tempfile::NamedTempFile;
+
+    fn pattern(len: usize) -> Vec<u8> {
+        (0..len).map(|i| (i % 251) as u8).collect()
+    }
+
+    #[test]
+    fn test_large_and_small_writes_preserve_order() -> io::Result<()> {
+        let file = NamedTempFile::new()?;
+        let mut output = UringFile::new(file.reopen()?);
+        let large = pattern(URING_THRESHOLD_BYTES * 2 + 3);
+        let small = pattern(100);
+        output.write_all(&small)?;
+        output.write_all(&large)?;
+        output.write_all(&small)?;
+        output.flush()?;
+        assert_eq!(
+            std::fs::read(file.path())?,
+            [small.clone(), large, small].concat()
+        );
+        Ok(())
+    }
+
+    #[test]
+    fn test_write_error_is_reported() -> io::Result<()> {
+        let file = NamedTempFile::new()?;
+        let mut output = UringFile::new(File::open(file.path())?);
+        assert!(output.write_all(&pattern(URING_THRESHOLD_BYTES)).is_err());
+        Ok(())
+    }
+}
@@ -54,6 +54,37 @@ def example_basic_usage():
         os.unlink(output_path)
 
 
+def example_batch_usage():
+    """Demonstrate tokenizing several files with a single call."""
+    print("\n=== Batch Tokenization Example ===")
+    
+    tokenizer = blt.ByteTokenizer()
+    texts = ["first document", "second document", "third document"]
+    
+    # Collect every (input, output) pair up front
+    pairs = []
+    for text in texts:
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as input_file:
+            input_file.write(text)
+        with tempfile.NamedTemporaryFile(suffix='.bin', delete=False) as output_file:
+            pass
+        pairs.append((input_file.name, output_file.name))
+    
+    try:
+        # One call tokenizes the whole batch on a shared runtime
+        tokenizer.tokenize_files(pairs)
+        
+        for input_path, output_path in pairs:
+            print(f"{os.path.basename(input_path)}: "
+                  f"{os.path.getsize(input_path)} -> {os.path.getsize(output_path)} bytes")
+        
+    finally:
+        # Clean up
+        for input_path, output_path in pairs:
+            os.unlink(input_path)
+            os.unlink(output_path)
+
+
 def example_bpe_merges():
     """Demonstrate BPE tokenization with custom merges."""
     print("\n=== BPE Merges Example ===")
@@ -72,8 +103,12 @@ def example_bpe_merges():
         merges = blt.load_bpe_merges(merges_path)
         print(f"Loaded merges: {merges}")
         
+        # A frozen table can be shared by many tokenizers without dict conversion
+        frozen_merges = blt.FrozenMerges.from_file(merges_path)
+        print(f"Frozen merges: {frozen_merges}")
+        
         # Create tokenizer with BPE merges
-        tokenizer = blt.ByteTokenizer(merges=merges)
+        tokenizer = blt.ByteTokenizer(merges=frozen_merges)
         print(f"Created BPE tokenizer: {tokenizer}")
         
         # Create input file with mergeable content
@@ -134,6 +169,7 @@ def main():
     
     try:
         example_basic_usage()
+        example_batch_usage()
         example_bpe_merges()
         example_configuration_options()
         
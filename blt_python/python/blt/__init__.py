@@ -9,8 +9,8 @@ Example usage:
     >>> tokenizer.tokenize_file("input.txt", "output.bin")
 """
 
-from .blt import ByteTokenizer, load_bpe_merges, version
+from .blt import ByteTokenizer, FrozenMerges, load_bpe_merges, version
 
 __version__ = version()
 
-__all__ = ["ByteTokenizer", "load_bpe_merges", "version", "__version__"] 
\ No newline at end of file
+__all__ = ["ByteTokenizer", "FrozenMerges", "load_bpe_merges", "version", "__version__"] 
\ No newline at end of file
@@ -1,8 +1,130 @@
 #![allow(clippy::useless_conversion)]
-use blt_core::{run_tokenizer, ContentType, CoreConfig};
+use blt_core::tokenizer::TokenizationStrategy;
+use blt_core::{
+    run_tokenizer_with_strategy, select_strategy, tokenize_bytes_with_strategy, BpeMerges,
+    ContentType, CoreConfig,
+};
+use pyo3::exceptions::PyKeyError;
 use pyo3::prelude::*;
-use std::collections::HashMap;
-use std::path::PathBuf;
+use pyo3::types::{PyBytes, PyDict};
+use std::io;
+use std::path::{Path, PathBuf};
+use std::sync::{Arc, OnceLock};
+
+/// An immutable BPE merge table owned by Rust.
+///
+/// Passing a `FrozenMerges` to `ByteTokenizer(merges=...)` shares the table instead of
+/// converting a dict entry by entry, so many tokenizers can be built from one table cheaply.
+///
+/// # Examples
+///
+/// ```python
+/// import blt
+/// merges = blt.FrozenMerges.from_file("merges.txt")
+/// tokenizer = blt.ByteTokenizer(merges=merges)
+/// ```
+#[pyclass(frozen)]
+pub struct FrozenMerges {
+    merges: Arc<BpeMerges>,
+}
+
+#[pymethods]
+impl FrozenMerges {
+    /// Freeze a dictionary of BPE merges: {(token1, token2): new_token}
+    #[new]
+    pub fn new(merges: BpeMerges) -> Self {
+        FrozenMerges {
+            merges: Arc::new(merges),
+        }
+    }
+
+    /// Load BPE merges from a file without building a Python dict.
+    ///
+    /// # Arguments
+    ///
+    /// * `path` - Path to the merges file
+    ///
+    /// # Raises
+    ///
+    /// * `IOError` - If the file cannot be read or its format is invalid
+    #[staticmethod]
+    pub fn from_file(py: Python<'_>, path: &str) -> PyResult<Self> {
+        let merges = py.allow_threads(|| blt_core::load_bpe_merge_table(Path::new(path)))?;
+        Ok(FrozenMerges {
+            merges: Arc::new(merges),
+        })
+    }
+
+    /// Copy the merges into a new dictionary.
+    pub fn to_dict<'py>(&self, py: Python<'py>) -> PyResult<Bound<'py, PyDict>> {
+        let dict = PyDict::new_bound(py);
+        for (&pair, &token) in self.merges.iter() {
+            dict.set_item(pair, token)?;
+        }
+        Ok(dict)
+    }
+
+    fn __len__(&self) -> usize {
+        self.merges.len()
+    }
+
+    fn __contains__(&self, key: &Bound<'_, PyAny>) -> bool {
+        self.lookup(key).is_some()
+    }
+
+    fn __getitem__(&self, key: &Bound<'_, PyAny>) -> PyResult<u16> {
+        self.lookup(key)
+            .ok_or_else(|| PyKeyError::new_err(key.clone().unbind()))
+    }
+
+    fn __repr__(&self) -> String {
+        format!("FrozenMerges(len={})", self.merges.len())
+    }
+}
+
+impl FrozenMerges {
+    /// Looks up `key` like a dict would: anything that is not a pair of token IDs is simply
+    /// absent, rather than an error.
+    fn lookup(&self, key: &Bound<'_, PyAny>) -> Option<u16> {
+        let pair: (u16, u16) = key.extract().ok()?;
+        self.merges.get(&pair).copied()
+    }
+}
+
+/// The `merges` argument of `ByteTokenizer`: a dict, or an already frozen table.
+#[derive(FromPyObject)]
+pub enum MergesArg<'py> {
+    Frozen(Bound<'py, FrozenMerges>),
+    Dict(BpeMerges),
+}
+
+impl MergesArg<'_> {
+    /// Returns the merge table, sharing it if it is already frozen.
+    fn into_table(self) -> Arc<BpeMerges> {
+        match self {
+            MergesArg::Frozen(frozen) => Arc::clone(&frozen.get().merges),
+            MergesArg::Dict(merges) => Arc::new(merges),
+        }
+    }
+}
+
+/// The `chunk_size` argument of `ByteTokenizer`: a byte count, or a size string like "1MB".
+#[derive(FromPyObject)]
+pub enum ChunkSizeArg {
+    Bytes(usize),
+    Human(String),
+}
+
+impl ChunkSizeArg {
+    /// Returns the chunk size in bytes, parsing size strings.
+    fn into_bytes(self) -> PyResult<usize> {
+        match self {
+            ChunkSizeArg::Bytes(bytes) => Ok(bytes),
+            ChunkSizeArg::Human(size) => CoreConfig::parse_chunk_size(&size)
+                .map_err(|e| PyErr::new::<pyo3::exceptions::PyValueError, _>(e.to_string())),
+        }
+    }
+}
 
 /// A Python wrapper for the BLT tokenizer.
 ///
@@ -26,11 +148,19 @@ use std::path::PathBuf;
 /// ```
 #[pyclass]
 pub struct ByteTokenizer {
-    merges: Option<HashMap<(u8, u8), u16>>,
+    /// Merge table converted from the Python dict once, at construction time.
+    merges: Option<Arc<BpeMerges>>,
     content_type: Option<String>,
     threads: Option<usize>,
-    chunk_size: Option<String>,
+    /// Chunk size in bytes, parsed once at construction time.
+    chunk_size: Option<usize>,
     memory_cap: Option<u8>,
+    cache_size: Option<usize>,
+    compact_output: bool,
+    word_level: bool,
+    /// Strategy built on first use and shared by every later call, so the merge lookup
+    /// table and the word cache are built once per tokenizer rather than once per call.
+    strategy: OnceLock<Arc<dyn TokenizationStrategy>>,
 }
 
 #[pymethods]
@@ -39,19 +169,29 @@ impl ByteTokenizer {
     ///
     /// # Arguments
     ///
-    /// * `merges` - Optional dictionary of BPE merges: {(byte1, byte2): new_token}
+    /// * `merges` - Optional dictionary of BPE merges: {(token1, token2): new_token},
+    ///   or a `FrozenMerges` table
     /// * `content_type` - Optional content type hint ("Text" or "Bin")
     /// * `threads` - Optional number of processing threads
-    /// * `chunk_size` - Optional chunk size (e.g., "1MB", "512KB")
+    /// * `chunk_size` - Optional chunk size in bytes, or as a string (e.g., "1MB", "512KB")
     /// * `memory_cap` - Optional memory usage cap as percentage (0-100)
+    /// * `cache_size` - Optional number of cached word encodings for word-level merges
+    ///   (0 disables the cache)
+    /// * `compact_output` - Write 1-byte tokens when no merges or content type are set,
+    ///   after a 1-byte header holding the token width
+    /// * `word_level` - Apply merges within whitespace-delimited words only, lowest merge
+    ///   ID first
     #[new]
-    #[pyo3(signature = (merges=None, content_type=None, threads=None, chunk_size=None, memory_cap=None))]
+    #[pyo3(signature = (merges=None, content_type=None, threads=None, chunk_size=None, memory_cap=None, cache_size=None, compact_output=false, word_level=false))]
     pub fn new(
-        merges: Option<HashMap<(u8, u8), u16>>,
+        merges: Option<MergesArg<'_>>,
         content_type: Option<String>,
         threads: Option<usize>,
-        chunk_size: Option<String>,
+        chunk_size: Option<ChunkSizeArg>,
         memory_cap: Option<u8>,
+        cache_size: Option<usize>,
+        compact_output: bool,
+        word_level: bool,
     ) -> PyResult<Self> {
         // Validate memory_cap
         if let Some(cap) = memory_cap {
@@ -74,12 +214,19 @@ impl ByteTokenizer {
             }
         }
 
+        // Parse size strings once here rather than on every tokenize call
+        let chunk_size = chunk_size.map(ChunkSizeArg::into_bytes).transpose()?;
+
         Ok(ByteTokenizer {
-            merges,
+            merges: merges.map(MergesArg::into_table),
             content_type,
             threads,
             chunk_size,
             memory_cap,
+            cache_size,
+            compact_output,
+            word_level,
+            strategy: OnceLock::new(),
         })
     }
 
@@ -95,88 +242,186 @@ impl ByteTokenizer {
     /// * `RuntimeError` - If tokenization fails
     /// * `IOError` - If file operations fail
     #[allow(clippy::useless_conversion)]
-    pub fn tokenize_file(&self, input_path: &str, output_path: &str) -> PyResult<()> {
-        let rt = tokio::runtime::Runtime::new()?;
+    pub fn tokenize_file(
+        &self,
+        py: Python<'_>,
+        input_path: &str,
+        output_path: &str,
+    ) -> PyResult<()> {
+        let pairs = [(input_path.to_string(), output_path.to_string())];
+        py.allow_threads(|| self.run_batch(&pairs))
+            .map_err(PyErr::from)
+    }
 
-        rt.block_on(async {
-            // Create temporary file for merges if we have them
-            let _temp_file = if let Some(ref merges) = self.merges {
-                let temp_file = tempfile::NamedTempFile::new()?;
-
-                // Write merges to temporary file
-                use std::io::Write;
-                {
-                    let mut file = std::fs::File::create(temp_file.path())?;
-
-                    for (a, b) in merges.keys() {
-                        writeln!(file, "{a} {b}")?;
-                    }
-                }
+    /// Tokenize several files in a single call.
+    ///
+    /// All pairs are scheduled on one shared runtime, so the Python/Rust
+    /// boundary and the worker pool setup are paid once per batch rather
+    /// than once per file. At most `threads` files are processed at once.
+    /// The GIL is released while the batch runs.
+    ///
+    /// # Arguments
+    ///
+    /// * `pairs` - List of `(input_path, output_path)` tuples
+    ///
+    /// # Raises
+    ///
+    /// * `RuntimeError` - If tokenization fails
+    /// * `IOError` - If file operations fail for any of the pairs
+    #[allow(clippy::useless_conversion)]
+    pub fn tokenize_files(&self, py: Python<'_>, pairs: Vec<(String, String)>) -> PyResult<()> {
+        py.allow_threads(|| self.run_batch(&pairs))
+            .map_err(PyErr::from)
+    }
 
-                // Create configuration and run tokenization
-                let content_type = self.content_type.as_ref().and_then(|ct| match ct.as_str() {
-                    "Text" => Some(ContentType::Text),
-                    "Bin" => Some(ContentType::Bin),
-                    _ => None,
-                });
-
-                let config = CoreConfig::new_from_cli(
-                    Some(PathBuf::from(input_path)),
-                    Some(PathBuf::from(output_path)),
-                    Some(temp_file.path().to_path_buf()),
-                    content_type,
-                    self.threads,
-                    self.chunk_size.clone(),
-                    self.memory_cap,
-                    false, // Don't use passthrough mode in Python API
-                )?;
-
-                run_tokenizer(config).await?;
-
-                Some(temp_file)
-            } else {
-                // Create configuration and run tokenization without merges
-                let content_type = self.content_type.as_ref().and_then(|ct| match ct.as_str() {
-                    "Text" => Some(ContentType::Text),
-                    "Bin" => Some(ContentType::Bin),
-                    _ => None,
-                });
-
-                let config = CoreConfig::new_from_cli(
-                    Some(PathBuf::from(input_path)),
-                    Some(PathBuf::from(output_path)),
-                    None,
-                    content_type,
-                    self.threads,
-                    self.chunk_size.clone(),
-                    self.memory_cap,
-                    false, // Don't use passthrough mode in Python API
-                )?;
-
-                run_tokenizer(config).await?;
-
-                None
-            };
-
-            // Keep temp file alive until this point
-            drop(_temp_file);
-            Ok(())
-        })
+    /// Tokenize an in-memory buffer and return the token stream.
+    ///
+    /// Produces exactly the bytes `tokenize_file` would write for the same
+    /// input, without touching the filesystem.
+    ///
+    /// # Arguments
+    ///
+    /// * `data` - The bytes to tokenize
+    ///
+    /// # Returns
+    ///
+    /// The tokenized output as `bytes`
+    ///
+    /// # Raises
+    ///
+    /// * `RuntimeError` - If tokenization fails
+    pub fn tokenize_bytes<'py>(
+        &self,
+        py: Python<'py>,
+        data: &[u8],
+    ) -> PyResult<Bound<'py, PyBytes>> {
+        let output = py.allow_threads(|| self.run_bytes(data))?;
+        Ok(PyBytes::new_bound(py, &output))
+    }
+
+    /// Number of BPE merge rules, or 0 if the tokenizer has none.
+    #[getter]
+    fn merges_len(&self) -> usize {
+        self.merges.as_ref().map_or(0, |m| m.len())
+    }
+
+    /// The content type passed at construction, if any.
+    #[getter]
+    fn content_type(&self) -> Option<&str> {
+        self.content_type.as_deref()
+    }
+
+    /// The chunk size in bytes, if one was set at construction.
+    #[getter]
+    fn chunk_size(&self) -> Option<usize> {
+        self.chunk_size
     }
 
     /// String representation of the tokenizer configuration.
     fn __repr__(&self) -> String {
         format!(
-            "ByteTokenizer(merges={}, content_type={:?}, threads={:?}, chunk_size={:?}, memory_cap={:?})",
-            self.merges.as_ref().map_or(0, |m| m.len()),
+            "ByteTokenizer(merges={}, content_type={:?}, threads={:?}, chunk_size={:?}, memory_cap={:?}, cache_size={:?}, compact_output={}, word_level={})",
+            self.merges_len(),
             self.content_type,
             self.threads,
             self.chunk_size,
-            self.memory_cap
+            self.memory_cap,
+            self.cache_size,
+            self.compact_output,
+            self.word_level
         )
     }
 }
 
+impl ByteTokenizer {
+    /// Runs the `(input, output)` pairs concurrently on a single Tokio runtime.
+    ///
+    /// At most `num_threads` pairs are in flight at once. Each run holds its input and
+    /// output files open, so starting every pair at once would exhaust file descriptors
+    /// on large batches of small files.
+    fn run_batch(&self, pairs: &[(String, String)]) -> io::Result<()> {
+        let configs = pairs
+            .iter()
+            .map(|(input, output)| self.build_config(Some(input.into()), Some(output.into())))
+            .collect::<io::Result<Vec<_>>>()?;
+        let Some(first) = configs.first() else {
+            return Ok(());
+        };
+        let strategy = self.strategy(first);
+
+        // Size the worker pool from the `threads` setting instead of defaulting to all cores.
+        let worker_threads = first.num_threads;
+        let rt = tokio::runtime::Builder::new_multi_thread()
+            .worker_threads(worker_threads)
+            .enable_all()
+            .build()?;
+        rt.block_on(async {
+            let mut pending = configs.into_iter();
+            let mut tasks = tokio::task::JoinSet::new();
+            for config in pending.by_ref().take(worker_threads) {
+                tasks.spawn(run_tokenizer_with_strategy(config, Arc::clone(&strategy)));
+            }
+            while let Some(joined) = tasks.join_next().await {
+                joined.map_err(io::Error::other)??;
+                if let Some(config) = pending.next() {
+                    tasks.spawn(run_tokenizer_with_strategy(config, Arc::clone(&strategy)));
+                }
+            }
+            Ok(())
+        })
+    }
+
+    /// Tokenizes `data` on a lightweight single-threaded runtime.
+    fn run_bytes(&self, data: &[u8]) -> io::Result<Vec<u8>> {
+        let config = self.build_config(None, None)?;
+        let strategy = self.strategy(&config);
+        let rt = tokio::runtime::Builder::new_current_thread().build()?;
+        rt.block_on(tokenize_bytes_with_strategy(&config, strategy, data))
+    }
+
+    /// Returns the shared strategy, building it from `config` on first use.
+    ///
+    /// Every config built by `build_config` selects the same strategy, since the input
+    /// and output paths do not affect it.
+    fn strategy(&self, config: &CoreConfig) -> Arc<dyn TokenizationStrategy> {
+        Arc::clone(self.strategy.get_or_init(|| select_strategy(config)))
+    }
+
+    fn build_config(
+        &self,
+        input_path: Option<PathBuf>,
+        output_path: Option<PathBuf>,
+    ) -> io::Result<CoreConfig> {
+        let mut config = CoreConfig::new_from_cli(
+            input_path,
+            output_path,
+            None,
+            self.core_content_type(),
+            self.threads,
+            None, // Set below from the size parsed at construction
+            self.memory_cap,
+            false, // Don't use passthrough mode in Python API
+        )?;
+        config.cli_chunk_size = self.chunk_size;
+        // Hand the frozen table straight to the core instead of round-tripping a merges file.
+        config.bpe_data = self.merges.clone();
+        if let Some(cache_size) = self.cache_size {
+            config.bpe_cache_size = cache_size;
+        }
+        config.compact_output = self.compact_output;
+        config.word_level_bpe = self.word_level;
+        Ok(config)
+    }
+
+    fn core_content_type(&self) -> Option<ContentType> {
+        self.content_type.as_ref().and_then(|ct| match ct.as_str() {
+            "Text" => Some(ContentType::Text),
+            "Bin" => Some(ContentType::Bin),
+            _ => None,
+        })
+    }
+}
+
 /// Load BPE merges from a file.
 ///
 /// # Arguments
@@ -192,9 +437,19 @@ impl ByteTokenizer {
 /// * `IOError` - If file cannot be read
 /// * `ValueError` - If file format is invalid
 #[pyfunction]
-#[allow(clippy::useless_conversion)]
-pub fn load_bpe_merges(path: &str) -> PyResult<HashMap<(u8, u8), u16>> {
-    blt_core::load_bpe_merges(&PathBuf::from(path)).map_err(|e| e.into())
+pub fn load_bpe_merges<'py>(py: Python<'py>, path: &str) -> PyResult<Bound<'py, PyDict>> {
+    let merges = py.allow_threads(|| blt_core::load_bpe_merge_table(Path::new(path)))?;
+    // Fill the dict straight from the parsed `u16` table, skipping the `(u8, u8)` map that
+    // `blt_core::load_bpe_merges` would build. Only byte pairs are kept, as before; byte
+    // values come from CPython's small-int cache, so each entry only allocates its key
+    // tuple and token ID.
+    let dict = PyDict::new_bound(py);
+    for ((first, second), token) in merges {
+        if first <= 255 && second <= 255 {
+            dict.set_item((first, second), token)?;
+        }
+    }
+    Ok(dict)
 }
 
 /// Get the version of the BLT library.
@@ -214,6 +469,7 @@ pub fn version() -> String {
 #[pymodule]
 fn blt(m: &Bound<'_, PyModule>) -> PyResult<()> {
     m.add_class::<ByteTokenizer>()?;
+    m.add_class::<FrozenMerges>()?;
     m.add_function(wrap_pyfunction!(load_bpe_merges, m)?)?;
     m.add_function(wrap_pyfunction!(version, m)?)?;
     Ok(())
@@ -8,6 +8,18 @@ import os
 import blt
 
 
+@pytest.fixture(scope="module")
+def default_tokenizer():
+    """A tokenizer with the default configuration, shared by the tests in this module."""
+    return blt.ByteTokenizer()
+
+
+@pytest.fixture(scope="module")
+def bpe_tokenizer():
+    """A tokenizer with a single merge: 'a' + 'b' -> token 256."""
+    return blt.ByteTokenizer(merges={(97, 98): 256})
+
+
 class TestByteTokenizer:
     """Test cases for ByteTokenizer class."""
 
@@ -15,27 +27,40 @@ class TestByteTokenizer:
         """Test creating a basic tokenizer."""
         tokenizer = blt.ByteTokenizer()
         assert tokenizer is not None
-        assert "ByteTokenizer" in str(tokenizer)
+        assert tokenizer.merges_len == 0
+        assert tokenizer.content_type is None
+        assert tokenizer.chunk_size is None
+        assert repr(tokenizer).startswith("ByteTokenizer(")
 
     def test_tokenizer_with_merges(self):
         """Test creating a tokenizer with BPE merges."""
         merges = {(97, 98): 256, (99, 100): 257}
         tokenizer = blt.ByteTokenizer(merges=merges)
-        assert "merges=2" in str(tokenizer)
+        assert tokenizer.merges_len == 2
 
     def test_tokenizer_with_content_type(self):
         """Test creating a tokenizer with content type."""
         tokenizer = blt.ByteTokenizer(content_type="Text")
-        assert 'content_type=Some("Text")' in str(tokenizer)
+        assert tokenizer.content_type == "Text"
         
         tokenizer = blt.ByteTokenizer(content_type="Bin")
-        assert 'content_type=Some("Bin")' in str(tokenizer)
+        assert tokenizer.content_type == "Bin"
 
     def test_invalid_content_type(self):
         """Test that invalid content types raise ValueError."""
         with pytest.raises(ValueError):
             blt.ByteTokenizer(content_type="Invalid")
 
+    def test_chunk_size_accepts_int_or_string(self):
+        """Test that chunk_size accepts a byte count or a size string."""
+        assert blt.ByteTokenizer(chunk_size="1MB").chunk_size == 1024 * 1024
+        assert blt.ByteTokenizer(chunk_size=1024 * 1024).chunk_size == 1024 * 1024
+
+    def test_invalid_chunk_size(self):
+        """Test that an invalid chunk size string raises ValueError at construction."""
+        with pytest.raises(ValueError):
+            blt.ByteTokenizer(chunk_size="12XB")
+
     def test_invalid_memory_cap(self):
         """Test that invalid memory cap values raise ValueError."""
         with pytest.raises(ValueError):
@@ -43,98 +68,89 @@ class TestByteTokenizer:
         
         # Note: negative values are not currently validated in the Rust code
 
-    def test_basic_tokenization(self):
+    def test_basic_tokenization(self, default_tokenizer):
         """Test basic tokenization functionality."""
-        tokenizer = blt.ByteTokenizer()
+        result = default_tokenizer.tokenize_bytes(b"hello world")
         
-        # Create temporary input file
-        with tempfile.NamedTemporaryFile(mode='wb', delete=False) as input_file:
-            input_file.write(b"hello world")
-            input_path = input_file.name
+        # Each byte becomes a big-endian u16 token
+        assert isinstance(result, bytes)
+        assert len(result) == 2 * len(b"hello world")
+        assert result[:4] == b"\x00h\x00e"
+
+    def test_compact_output(self):
+        """Test that compact output writes a width header and 1-byte tokens."""
+        tokenizer = blt.ByteTokenizer(compact_output=True)
         
-        # Create temporary output file
-        with tempfile.NamedTemporaryFile(delete=False) as output_file:
-            output_path = output_file.name
+        result = tokenizer.tokenize_bytes(b"hello")
         
-        try:
-            tokenizer.tokenize_file(input_path, output_path)
-            
-            # Check that output file was created and has content
-            assert os.path.exists(output_path)
-            with open(output_path, 'rb') as f:
-                result = f.read()
-            assert len(result) > 0
-            
-        finally:
-            # Clean up
-            os.unlink(input_path)
-            os.unlink(output_path)
+        assert result == b"\x01hello"
 
-    def test_empty_input(self):
-        """Test tokenization with empty input."""
-        tokenizer = blt.ByteTokenizer()
+    def test_compact_output_keeps_u16_tokens_with_merges(self):
+        """Test that compact output falls back to 2-byte tokens when merges are set."""
+        tokenizer = blt.ByteTokenizer(merges={(97, 98): 256}, compact_output=True)
         
-        # Create temporary input file
-        with tempfile.NamedTemporaryFile(mode='wb', delete=False) as input_file:
-            input_file.write(b"")
-            input_path = input_file.name
+        result = tokenizer.tokenize_bytes(b"ab")
         
-        # Create temporary output file
-        with tempfile.NamedTemporaryFile(delete=False) as output_file:
-            output_path = output_file.name
+        assert result == b"\x02" + (256).to_bytes(2, "big")
+
+    def test_empty_input(self, default_tokenizer):
+        """Test tokenization with empty input."""
+        result = default_tokenizer.tokenize_bytes(b"")
         
-        try:
-            tokenizer.tokenize_file(input_path, output_path)
-            
-            # Check that output file was created
-            assert os.path.exists(output_path)
-            with open(output_path, 'rb') as f:
-                result = f.read()
-            assert isinstance(result, bytes)
-            
-        finally:
-            # Clean up
-            os.unlink(input_path)
-            os.unlink(output_path)
+        assert isinstance(result, bytes)
+        assert result == b""
 
-    def test_bpe_tokenization(self):
+    def test_bpe_tokenization(self, bpe_tokenizer):
         """Test BPE tokenization with merges."""
-        # Simple merge: 'ab' -> token 256
-        merges = {(97, 98): 256}  # 'a' + 'b' -> token 256
+        result = bpe_tokenizer.tokenize_bytes(b"ab")
+        
+        assert isinstance(result, bytes)
+        assert result == (256).to_bytes(2, "big")
+
+    def test_bpe_tokenization_uses_merge_ids(self):
+        """Test that merge IDs from the dict are used, including chained merges."""
+        merges = {(97, 98): 300, (300, 99): 301}  # 'ab' -> 300, then 300 + 'c' -> 301
         tokenizer = blt.ByteTokenizer(merges=merges)
         
-        # Create temporary input file
-        with tempfile.NamedTemporaryFile(mode='wb', delete=False) as input_file:
-            input_file.write(b"ab")
-            input_path = input_file.name
+        result = tokenizer.tokenize_bytes(b"abcab")
         
-        # Create temporary output file
-        with tempfile.NamedTemporaryFile(delete=False) as output_file:
-            output_path = output_file.name
+        expected = b"".join(t.to_bytes(2, "big") for t in (301, 300))
+        assert result == expected
+
+    def test_text_bpe_tokenization_with_cache(self):
+        """Test that cached and uncached word-level BPE produce the same tokens."""
+        merges = {(97, 98): 256, (32, 256): 257}  # 'ab' -> 256, ' ' + 256 -> 257
+        data = b"ab ab ab\nab"
+        cached = blt.ByteTokenizer(merges=merges, content_type="Text", cache_size=16, word_level=True)
+        uncached = blt.ByteTokenizer(merges=merges, content_type="Text", cache_size=0, word_level=True)
         
-        try:
-            tokenizer.tokenize_file(input_path, output_path)
-            
-            # Check that output file was created and has content
-            assert os.path.exists(output_path)
-            with open(output_path, 'rb') as f:
-                result = f.read()
-            
-            assert isinstance(result, bytes)
-            assert len(result) > 0
-            
-        finally:
-            # Clean up
-            os.unlink(input_path)
-            os.unlink(output_path)
+        result = cached.tokenize_bytes(data)
+        
+        assert result == cached.tokenize_bytes(data)
+        assert result == uncached.tokenize_bytes(data)
+        # Content-type token, then the words "ab", " ab", " ab", "\nab"
+        expected = [0xFF01, 256, 257, 257, 10, 256]
+        assert result == b"".join(t.to_bytes(2, "big") for t in expected)
 
-    def test_file_tokenization(self):
+    def test_word_level_bpe_is_opt_in(self):
+        """Test that merges cross word boundaries unless word_level is set."""
+        merges = {(98, 32): 256}  # 'b' ' ' -> 256
+        
+        default = blt.ByteTokenizer(merges=merges, content_type="Text")
+        word_level = blt.ByteTokenizer(merges=merges, content_type="Text", word_level=True)
+        
+        expected_default = [0xFF01, 256, 97]
+        expected_word_level = [0xFF01, 98, 32, 97]
+        assert default.tokenize_bytes(b"b a") == b"".join(t.to_bytes(2, "big") for t in expected_default)
+        assert word_level.tokenize_bytes(b"b a") == b"".join(t.to_bytes(2, "big") for t in expected_word_level)
+
+    def test_file_tokenization(self, default_tokenizer):
         """Test file-based tokenization."""
-        tokenizer = blt.ByteTokenizer()
+        text = "This is a test file for tokenization."
         
         # Create test input file
         with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as input_file:
-            input_file.write("This is a test file for tokenization.")
+            input_file.write(text)
             input_path = input_file.name
         
         # Create output file path
@@ -143,11 +159,13 @@ class TestByteTokenizer:
         
         try:
             # Tokenize the file
-            tokenizer.tokenize_file(input_path, output_path)
+            default_tokenizer.tokenize_file(input_path, output_path)
             
-            # Verify output exists and has content
+            # Verify output exists and matches the in-memory API
             assert os.path.exists(output_path)
-            assert os.path.getsize(output_path) > 0
+            with open(output_path, 'rb') as f:
+                result = f.read()
+            assert result == default_tokenizer.tokenize_bytes(text.encode())
             
         finally:
             # Clean up
@@ -162,57 +180,59 @@ class TestByteTokenizer:
             memory_cap=50
         )
         
-        # Create temporary input file
-        with tempfile.NamedTemporaryFile(mode='wb', delete=False) as input_file:
-            input_file.write(b"test data for configuration")
-            input_path = input_file.name
+        result = tokenizer.tokenize_bytes(b"test data for configuration")
         
-        # Create temporary output file
-        with tempfile.NamedTemporaryFile(delete=False) as output_file:
-            output_path = output_file.name
+        assert isinstance(result, bytes)
+        assert len(result) == 2 * len(b"test data for configuration")
+
+    def test_large_data(self, default_tokenizer):
+        """Test tokenization with larger data."""
+        large_data = b"x" * (100 * 1024)  # 100KB
+        
+        result = default_tokenizer.tokenize_bytes(large_data)
+        
+        assert isinstance(result, bytes)
+        assert len(result) == 2 * len(large_data)
+
+    def test_batch_tokenization(self, default_tokenizer):
+        """Test that a batch produces the same output as per-file calls."""
+        contents = [b"hello world", b"", b"another input file"]
+        
+        paths = []
+        for data in contents:
+            with tempfile.NamedTemporaryFile(mode='wb', delete=False) as input_file:
+                input_file.write(data)
+            with tempfile.NamedTemporaryFile(delete=False) as batch_output:
+                pass
+            with tempfile.NamedTemporaryFile(delete=False) as single_output:
+                pass
+            paths.append((input_file.name, batch_output.name, single_output.name))
         
         try:
-            tokenizer.tokenize_file(input_path, output_path)
-            
-            # Check that output file was created and has content
-            assert os.path.exists(output_path)
-            with open(output_path, 'rb') as f:
-                result = f.read()
-            assert isinstance(result, bytes)
+            default_tokenizer.tokenize_files([(i, b) for i, b, _ in paths])
+            for input_path, batch_path, single_path in paths:
+                default_tokenizer.tokenize_file(input_path, single_path)
+                with open(batch_path, 'rb') as f:
+                    batch_result = f.read()
+                with open(single_path, 'rb') as f:
+                    single_result = f.read()
+                assert batch_result == single_result
             
         finally:
             # Clean up
-            os.unlink(input_path)
-            os.unlink(output_path)
+            for path_group in paths:
+                for path in path_group:
+                    os.unlink(path)
 
-    def test_large_data(self):
-        """Test tokenization with larger data."""
-        tokenizer = blt.ByteTokenizer()
-        
-        # Create temporary input file with 100KB of test data
-        with tempfile.NamedTemporaryFile(mode='wb', delete=False) as input_file:
-            large_data = b"x" * (100 * 1024)  # 100KB
-            input_file.write(large_data)
-            input_path = input_file.name
-        
-        # Create temporary output file
+    def test_batch_tokenization_missing_input(self, default_tokenizer):
+        """Test that a missing input in a batch raises IOError."""
         with tempfile.NamedTemporaryFile(delete=False) as output_file:
             output_path = output_file.name
         
         try:
-            tokenizer.tokenize_file(input_path, output_path)
-            
-            # Check that output file was created and has content
-            assert os.path.exists(output_path)
-            with open(output_path, 'rb') as f:
-                result = f.read()
-            
-            assert isinstance(result, bytes)
-            assert len(result) > 0
-            
+            with pytest.raises(IOError):
+                default_tokenizer.tokenize_files([("non_existent_file.txt", output_path)])
         finally:
-            # Clean up
-            os.unlink(input_path)
             os.unlink(output_path)
 
 
@@ -243,13 +263,67 @@ class TestUtilityFunctions:
             merges = blt.load_bpe_merges(merges_path)
             assert isinstance(merges, dict)
             assert len(merges) == 2
-            assert (97, 98) in merges
-            assert (99, 100) in merges
+            assert merges[(97, 98)] == 256
+            assert merges[(99, 100)] == 257
             
         finally:
             os.unlink(merges_path)
 
 
+class TestFrozenMerges:
+    """Test cases for the FrozenMerges table."""
+
+    def test_frozen_merges_from_dict(self):
+        """Test freezing a dict and reading it back."""
+        merges = blt.FrozenMerges({(97, 98): 256, (256, 99): 257})
+        
+        assert len(merges) == 2
+        assert (97, 98) in merges
+        assert (98, 97) not in merges
+        assert merges[(256, 99)] == 257
+        assert merges.to_dict() == {(97, 98): 256, (256, 99): 257}
+        with pytest.raises(KeyError):
+            merges[(1, 2)]
+
+    def test_frozen_merges_non_token_keys_are_missing(self):
+        """Test that keys which are not token-ID pairs behave like missing dict keys."""
+        merges = blt.FrozenMerges({(97, 98): 256})
+        
+        for key in [(70000, 1), (-1, 98), (97,), "ab", None]:
+            assert key not in merges
+            with pytest.raises(KeyError):
+                merges[key]
+
+    def test_frozen_merges_from_file(self):
+        """Test loading a FrozenMerges table straight from a merges file."""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as merges_file:
+            merges_file.write("97 98\n")
+            merges_file.write("99 100\n")
+            merges_path = merges_file.name
+        
+        try:
+            merges = blt.FrozenMerges.from_file(merges_path)
+            assert merges.to_dict() == blt.load_bpe_merges(merges_path)
+        finally:
+            os.unlink(merges_path)
+
+    def test_frozen_merges_from_file_not_found(self):
+        """Test loading a FrozenMerges table from a non-existent file."""
+        with pytest.raises(IOError):
+            blt.FrozenMerges.from_file("non_existent_file.txt")
+
+    def test_tokenizer_accepts_frozen_merges(self):
+        """Test that a frozen table tokenizes exactly like the equivalent dict."""
+        merges = {(97, 98): 256, (256, 99): 257}
+        frozen = blt.FrozenMerges(merges)
+        
+        tokenizer = blt.ByteTokenizer(merges=frozen)
+        
+        assert tokenizer.merges_len == 2
+        data = b"abcab abc"
+        assert tokenizer.tokenize_bytes(data) == blt.ByteTokenizer(merges=merges).tokenize_bytes(data)
+
+
 class TestModuleAttributes:
     """Test module-level attributes and exports."""
 
@@ -261,7 +335,7 @@ class TestModuleAttributes:
 
     def test_module_exports(self):
         """Test that all expected symbols are exported."""
-        expected_exports = ['ByteTokenizer', 'load_bpe_merges', 'version', '__version__']
+        expected_exports = ['ByteTokenizer', 'FrozenMerges', 'load_bpe_merges', 'version', '__version__']
         for export in expected_exports:
             assert hasattr(blt, export), f"Missing export: {export}"
 
@@ -269,39 +343,21 @@ class TestModuleAttributes:
 class TestPerformance:
     """Performance-related tests."""
 
-    def test_performance_benchmark(self):
+    def test_performance_benchmark(self, default_tokenizer):
         """Basic performance test."""
         import time
         
-        tokenizer = blt.ByteTokenizer()
+        data = b"x" * (100 * 1024)  # 100KB test data
         
-        # Create temporary input file with 100KB of test data
-        with tempfile.NamedTemporaryFile(mode='wb', delete=False) as input_file:
-            data = b"x" * (100 * 1024)  # 100KB test data
-            input_file.write(data)
-            input_path = input_file.name
+        start_time = time.time()
+        result = default_tokenizer.tokenize_bytes(data)
+        end_time = time.time()
         
-        # Create temporary output file
-        with tempfile.NamedTemporaryFile(delete=False) as output_file:
-            output_path = output_file.name
+        duration = end_time - start_time
         
-        try:
-            start_time = time.time()
-            tokenizer.tokenize_file(input_path, output_path)
-            end_time = time.time()
-            
-            duration = end_time - start_time
-            
-            # Should complete quickly (less than 1 second for 100KB)
-            assert duration < 1.0
-            
-            # Check results
-            with open(output_path, 'rb') as f:
-                result = f.read()
-            assert isinstance(result, bytes)
-            assert len(result) > 0
-            
-        finally:
-            # Clean up
-            os.unlink(input_path)
-            os.unlink(output_path) 
\ No newline at end of file
+        # Should complete quickly (less than 1 second for 100KB)
+        assert duration < 1.0
+        
+        # Check results
+        assert isinstance(result, bytes)
+        assert len(result) > 0
@@ -57,6 +57,18 @@ struct CliArgs {
         help = "Min/Max chunk size (e.g. 4MB, 256KB)."
     )]
     chunksize: Option<String>,
+
+    #[arg(
+        long,
+        help = "Write 1-byte tokens when the vocabulary allows it, after a 1-byte width header"
+    )]
+    compact: bool,
+
+    #[arg(
+        long,
+        help = "Apply BPE merges within whitespace-delimited words only, lowest merge ID first"
+    )]
+    word_level: bool,
 }
 
 #[derive(clap::ValueEnum, Clone, Debug)]
@@ -78,15 +90,14 @@ impl From<CliContentType> for CoreContentType {
     }
 }
 
-#[tokio::main]
-async fn main() -> io::Result<()> {
+fn main() -> io::Result<()> {
     tracing_subscriber::fmt()
         .with_env_filter(tracing_subscriber::EnvFilter::from_default_env())
         .init();
 
     let cli_args = CliArgs::parse();
 
-    let core_config = CoreConfig::new_from_cli(
+    let mut core_config = CoreConfig::new_from_cli(
         cli_args.input,
         cli_args.output,
         cli_args.merges,
@@ -96,8 +107,16 @@ async fn main() -> io::Result<()> {
         cli_args.memcap,
         cli_args.passthrough,
     )?;
+    core_config.compact_output = cli_args.compact;
+    core_config.word_level_bpe = cli_args.word_level;
+
+    // Size the runtime to the configured worker count so --threads bounds CPU usage.
+    let runtime = tokio::runtime::Builder::new_multi_thread()
+        .worker_threads(core_config.num_threads)
+        .enable_all()
+        .build()?;
 
-    if let Err(e) = blt_core::run_tokenizer(core_config).await {
+    if let Err(e) = runtime.block_on(blt_core::run_tokenizer(core_config)) {
         eprintln!("Error running tokenizer: {e}");
         std::process::exit(1);
     }
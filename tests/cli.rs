@@ -139,6 +139,37 @@ fn test_cli_bpe_merges() {
     assert_eq!(output.stdout, expected_output);
 }
 
+#[test]
+fn test_cli_word_level_bpe() {
+    let cli_path = get_cli_binary_path();
+
+    let mut merges_file = NamedTempFile::new().unwrap();
+    merges_file.write_all(b"98 32\n").unwrap(); // 'b' ' ' -> 256
+    let merges_path = merges_file.path();
+
+    let run = |word_level: bool| {
+        let mut cmd = Command::new(&cli_path);
+        cmd.stdin(Stdio::piped()).stdout(Stdio::piped());
+        cmd.arg("--merges").arg(merges_path);
+        if word_level {
+            cmd.arg("--word-level");
+        }
+        let mut child = cmd.spawn().expect("Failed to spawn CLI process");
+        {
+            let stdin = child.stdin.as_mut().expect("Failed to open stdin");
+            stdin.write_all(b"b a").expect("Failed to write to stdin");
+        }
+        let output = child.wait_with_output().expect("Failed to read stdout");
+        assert!(output.status.success());
+        output.stdout
+    };
+
+    // By default merges apply across the space; word-level BPE keeps ' ' with the next word.
+    let tokens = |ids: &[u16]| -> Vec<u8> { ids.iter().flat_map(|t| t.to_be_bytes()).collect() };
+    assert_eq!(run(false), tokens(&[256, 97]));
+    assert_eq!(run(true), tokens(&[98, 32, 97]));
+}
+
 #[test]
 fn test_cli_chunksize_argument() {
     // This test mainly checks if the argument is accepted and the program runs.